@@ -1,13 +1,19 @@
 from django.contrib import admin, messages
-from django.utils.translation import gettext_lazy as _
+from django.db.models import OuterRef, Subquery
+from django.utils.translation import gettext_lazy as _, ngettext
 from .models import KoboFieldMapping, KoboForm, KoboSyncLog, KoboToken
-from .synchronizer import start_sync
+from .tasks import sync_form_task
+
+# core.User.__str__ lit i_user, puis t_user, officer et claim_admin : jointures chargées avec l'utilisateur
+USER_STR_RELATED = ('user__i_user', 'user__t_user', 'user__officer', 'user__claim_admin')
 
 
 @admin.register(KoboFieldMapping)
 class KoboFieldMappingAdmin(admin.ModelAdmin):
     list_display = ('kobo_form', 'kobo_field', 'grievance_field')
     list_filter = ('kobo_form',)
+    # KoboForm.__str__ affiche kobo_form.user.username
+    list_select_related = ('kobo_form__user',)
     search_fields = ('kobo_field', 'grievance_field')
 
     def save_model(self, request, obj, form, change):
@@ -30,32 +36,56 @@ class KoboSyncLogInline(admin.TabularInline):
 @admin.register(KoboForm)
 class KoboFormAdmin(admin.ModelAdmin):
     list_display = ('name', 'kobo_uid', 'user', 'auto_sync', 'last_sync_date', 'last_sync_status')
+    list_select_related = (*USER_STR_RELATED, 'api_key')
     search_fields = ('name', 'kobo_uid')
     inlines = [KoboFieldMappingInline,]
     actions = ['sync_selected_forms']
 
+    def get_queryset(self, request):
+        # Dernier log calculé dans la même requête SQL (évite un ORDER BY par ligne affichée)
+        qs = super().get_queryset(request)
+        latest_log = KoboSyncLog.objects.filter(kobo_form=OuterRef('pk')).order_by('-sync_date')
+        return qs.select_related(*USER_STR_RELATED, 'api_key').annotate(
+            _last_sync_status=Subquery(latest_log.values('status')[:1]),
+            _last_sync_action=Subquery(latest_log.values('action')[:1]),
+        )
+
     @admin.action(description="Lancer la synchronisation des formulaires sélectionnés")
     def sync_selected_forms(self, request, queryset):
         success, failure = 0, 0
+        error_tmpl = _("Erreur pour %(name)s : %(error)s")
 
-        for form in queryset:
+        # Chaque formulaire est synchronisé par un worker Celery : la requête admin rend la main aussitôt
+        for form in queryset.only('id', 'name'):
             try:
-                start_sync(form, request.user)
+                sync_form_task.delay(str(form.pk), str(request.user.pk))
                 success += 1
             except Exception as e:
-                messages.error(request, _(f"Erreur pour {form.name} : {str(e)}"))
+                messages.error(request, error_tmpl % {'name': form.name, 'error': e})
                 failure += 1
 
         if success:
-            self.message_user(request, _(f"{success} synchronisation(s) réussie(s)."), level=messages.SUCCESS)
+            self.message_user(request, ngettext(
+                "%(count)d synchronisation planifiée.",
+                "%(count)d synchronisations planifiées.",
+                success,
+            ) % {'count': success}, level=messages.SUCCESS)
         if failure:
-            self.message_user(request, _(f"{failure} échec(s) de synchronisation."), level=messages.ERROR)
+            self.message_user(request, ngettext(
+                "%(count)d échec de synchronisation.",
+                "%(count)d échecs de synchronisation.",
+                failure,
+            ) % {'count': failure}, level=messages.ERROR)
 
     @admin.display(description="Dernier statut sync")
     def last_sync_status(self, obj):
-        last_log = obj.sync_logs.order_by('-sync_date').first()
-        if last_log:
-            return f"{last_log.status} ({last_log.action})"
+        if hasattr(obj, '_last_sync_status'):
+            status, action = obj._last_sync_status, obj._last_sync_action
+        else:
+            last_log = obj.sync_logs.order_by('-sync_date').first()
+            status, action = (last_log.status, last_log.action) if last_log else (None, None)
+        if status:
+            return f"{status} ({action})"
         return "Jamais synchronisé"
 
     def save_model(self, request, obj, form, change):
@@ -67,6 +97,7 @@ class KoboTokenAdmin(admin.ModelAdmin):
     list_display = ('user', 'url_kobo', 'api_version', 'api_key')
     search_fields = ('user__username', 'url_kobo', 'api_key')
     list_filter = ('api_version',)
+    list_select_related = USER_STR_RELATED
     # readonly_fields = ('created_at', 'updated_at')
 
     fieldsets = (
@@ -15,6 +15,9 @@ DEFAULT_CFG = {
     "gql_mutation_tokens_add_perms": ["121809"],
     "gql_mutation_tokens_update_perms": ["121810"],
     "gql_mutation_tokens_delete_perms": ["121811"],
+
+    # Profondeur maximale (nombre de niveaux de champs) acceptée pour une query GraphQL
+    "gql_query_max_depth": 8,
 }
 
 
@@ -34,19 +37,23 @@ class KoboConnectConfig(AppConfig):
     gql_mutation_tokens_update_perms = []
     gql_mutation_tokens_delete_perms = []
 
+    gql_query_max_depth = 8
+
     def __load_config(self, cfg):
         """
         Charge dynamiquement les permissions définies dans la configuration du module.
         """
-        for field in cfg:
-            if hasattr(KoboConnectConfig, field):
-                setattr(KoboConnectConfig, field, cfg[field])
+        for field in vars(KoboConnectConfig).keys() & cfg.keys():
+            setattr(KoboConnectConfig, field, cfg[field])
 
     def ready(self):
         """
         Appelé à l'initialisation de l'application.
         Enregistre la configuration du module dans ModuleConfiguration.
+        Connecte aussi les receivers du module (signals.py).
         """
         from core.models import ModuleConfiguration
         cfg = ModuleConfiguration.get_or_default(MODULE_NAME, DEFAULT_CFG)
         self.__load_config(cfg)
+
+        from . import signals  # noqa: F401  (connexion des receivers)
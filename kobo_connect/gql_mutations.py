@@ -1,143 +1,97 @@
-import graphene
-from core.gql.gql_mutations.base_mutation import BaseHistoryModelCreateMutationMixin, BaseMutation, \
-    BaseHistoryModelUpdateMutationMixin, BaseHistoryModelDeleteMutationMixin
 from core.schema import OpenIMISMutation
-from .models import KoboToken, KoboForm, KoboFormMutation, KoboSyncLog, KoboFieldMapping
-from django.core.exceptions import PermissionDenied
-from django.utils.translation import gettext_lazy as _
-from django.contrib.auth.models import User
-from .gql_types import KoboFormGQLType, KoboTokenGQLType, KoboSyncLogGQLType, KoboFieldMappingGQLType
+from .models import KoboToken, KoboForm, KoboSyncLog, KoboFieldMapping
+from django.db import transaction
+from .util import check_perms, history_update_fields
 
-
-class CreateKoboTokenMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.add_kobotoken'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_token = KoboToken(**data)
-        kobo_token.save(user=info.context.user)
-        return None
-
-
-class UpdateKoboTokenMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.change_kobotoken'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_token = KoboToken.objects.get(id=data['id'])
-        for key, value in data.items():
-            setattr(kobo_token, key, value)
-        kobo_token.save(user=info.context.user)
-        return None
-
-
-
-class DeleteKoboTokenMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.delete_kobotoken'):
-            raise PermissionDenied(_("Unauthorized"))
-        KoboToken.objects.filter(id__in=data['ids']).delete()
-        return None
-
-
-
-class CreateKoboFormMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.add_koboform'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_form = KoboForm(**data)
-        kobo_form.save(user=info.context.user)
-        return None
+DELETE_CHUNK_SIZE = 1000
 
 
+def _delete_in_chunks(model, ids, chunk_size=DELETE_CHUNK_SIZE):
+    # Queryset.delete() is kept (not _raw_delete) so Django still runs the cascades and the
+    # pre/post_delete signals simple_history relies on; chunking bounds the collector's IN lists
+    # and a single transaction avoids committing every cascaded table separately.
+    ids = list(ids)
+    with transaction.atomic():
+        for start in range(0, len(ids), chunk_size):
+            model.objects.filter(id__in=ids[start:start + chunk_size]).delete()
 
-class UpdateKoboFormMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.change_koboform'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_form = KoboForm.objects.get(id=data['id'])
-        for key, value in data.items():
-            setattr(kobo_form, key, value)
-        kobo_form.save(user=info.context.user)
-        return None
 
+def _update_instance(model, data, user):
+    # update_fields limits the UPDATE to the columns whose value really changed (plus the audit
+    # columns HistoryModel.save() maintains): resubmitted TextFields are not written back
+    data = dict(data)
+    instance = model.objects.get(id=data.pop('id'))
+    for key, value in data.items():
+        setattr(instance, key, value)
+    changed = instance.get_dirty_fields(check_relationship=True)
+    if changed:
+        instance.save(user=user, update_fields=history_update_fields(changed))
+    return instance
 
 
-class DeleteKoboFormMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.delete_koboform'):
-            raise PermissionDenied(_("Unauthorized"))
-        KoboForm.objects.filter(id__in=data['ids']).delete()
-        return None
+class _KoboCreateMutation(OpenIMISMutation):
+    model = None
+    permission = None
 
+    class Meta:
+        abstract = True
 
-
-class CreateKoboSyncLogMutation(OpenIMISMutation):
     @classmethod
     def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.add_kobosynclog'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_sync_log = KoboSyncLog(**data)
-        kobo_sync_log.save(user=info.context.user)
+        check_perms(info, cls.permission)
+        cls.model(**data).save(user=info.context.user)
         return None
 
 
+class _KoboUpdateMutation(OpenIMISMutation):
+    model = None
+    permission = None
 
-class UpdateKoboSyncLogMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.change_kobosynclog'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_sync_log = KoboSyncLog.objects.get(id=data['id'])
-        for key, value in data.items():
-            setattr(kobo_sync_log, key, value)
-        kobo_sync_log.save(user=info.context.user)
-        return None
-
+    class Meta:
+        abstract = True
 
-
-class DeleteKoboSyncLogMutation(OpenIMISMutation):
     @classmethod
     def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.delete_kobosynclog'):
-            raise PermissionDenied(_("Unauthorized"))
-        KoboSyncLog.objects.filter(id__in=data['ids']).delete()
+        check_perms(info, cls.permission)
+        _update_instance(cls.model, data, info.context.user)
         return None
 
 
+class _KoboDeleteMutation(OpenIMISMutation):
+    model = None
+    permission = None
 
-class CreateKoboFieldMappingMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.add_kobofieldmapping'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_field_mapping = KoboFieldMapping(**data)
-        kobo_field_mapping.save(user=info.context.user)
-        return None
-
-
+    class Meta:
+        abstract = True
 
-class UpdateKoboFieldMappingMutation(OpenIMISMutation):
     @classmethod
     def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.change_kobofieldmapping'):
-            raise PermissionDenied(_("Unauthorized"))
-        kobo_field_mapping = KoboFieldMapping.objects.get(id=data['id'])
-        for key, value in data.items():
-            setattr(kobo_field_mapping, key, value)
-        kobo_field_mapping.save(user=info.context.user)
+        check_perms(info, cls.permission)
+        _delete_in_chunks(cls.model, data['ids'])
         return None
 
 
-
-class DeleteKoboFieldMappingMutation(OpenIMISMutation):
-    @classmethod
-    def mutate(cls, root, info, **data):
-        if not info.context.user.has_perms('kobo_connect.delete_kobofieldmapping'):
-            raise PermissionDenied(_("Unauthorized"))
-        KoboFieldMapping.objects.filter(id__in=data['ids']).delete()
-        return None
+def _crud_mutations(model):
+    """
+    Builds the Create/Update/Delete mutation classes of a model; they all share the
+    mutate() of their base class and only differ by model and permission codename.
+    """
+    codename = model.__name__.lower()
+    return tuple(
+        type(f"{action}{model.__name__}Mutation", (base,), {
+            'model': model,
+            'permission': f"kobo_connect.{perm}_{codename}",
+        })
+        for action, base, perm in (
+            ("Create", _KoboCreateMutation, "add"),
+            ("Update", _KoboUpdateMutation, "change"),
+            ("Delete", _KoboDeleteMutation, "delete"),
+        )
+    )
+
+
+CreateKoboTokenMutation, UpdateKoboTokenMutation, DeleteKoboTokenMutation = _crud_mutations(KoboToken)
+CreateKoboFormMutation, UpdateKoboFormMutation, DeleteKoboFormMutation = _crud_mutations(KoboForm)
+CreateKoboSyncLogMutation, UpdateKoboSyncLogMutation, DeleteKoboSyncLogMutation = _crud_mutations(KoboSyncLog)
+CreateKoboFieldMappingMutation, UpdateKoboFieldMappingMutation, DeleteKoboFieldMappingMutation = \
+    _crud_mutations(KoboFieldMapping)
@@ -1,11 +1,12 @@
 import graphene
-from graphene_django import DjangoObjectType
-from django.core.exceptions import PermissionDenied
+import graphene_django_optimizer as gql_optimizer
 from django.utils.translation import gettext as _
+from graphql import GraphQLError
 from .models import KoboForm, KoboToken, KoboSyncLog, KoboFieldMapping
-from django.contrib.auth.models import User
 from core.schema import OrderedDjangoFilterConnectionField
-from .gql_types import KoboFormGQLType, KoboTokenGQLType, KoboSyncLogGQLType, KoboFieldMappingGQLType
+from .apps import KoboConnectConfig
+from .gql_types import KoboFormGQLType, KoboTokenGQLType, KoboSyncLogGQLType, KoboFieldMappingGQLType, selection_depth
+from .util import check_perms
 
 
 
@@ -30,39 +31,56 @@ class Query(graphene.ObjectType):
 
     def resolve_kobo_forms(self, info, **kwargs):
         self.check_permissions(info, 'kobo_connect.view_koboform')
-        return KoboForm.objects.all()
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboForm.objects.all(), info)
 
     def resolve_kobo_form(self, info, id):
         self.check_permissions(info, 'kobo_connect.view_koboform')
-        return KoboForm.objects.get(pk=id)
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboForm.objects.filter(pk=id), info).get()
 
     def resolve_kobo_tokens(self, info, **kwargs):
         self.check_permissions(info, 'kobo_connect.view_kobotoken')
-        return KoboToken.objects.all()
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboToken.objects.all(), info)
 
     def resolve_kobo_token(self, info, id):
         self.check_permissions(info, 'kobo_connect.view_kobotoken')
-        return KoboToken.objects.get(pk=id)
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboToken.objects.filter(pk=id), info).get()
 
     def resolve_kobo_sync_logs(self, info, **kwargs):
         self.check_permissions(info, 'kobo_connect.view_kobosynclog')
-        return KoboSyncLog.objects.all()
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboSyncLog.objects.all(), info)
 
     def resolve_kobo_sync_log(self, info, id):
         self.check_permissions(info, 'kobo_connect.view_kobosynclog')
-        return KoboSyncLog.objects.get(pk=id)
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboSyncLog.objects.filter(pk=id), info).get()
 
     def resolve_kobo_field_mappings(self, info, **kwargs):
         self.check_permissions(info, 'kobo_connect.view_kobofieldmapping')
-        return KoboFieldMapping.objects.all()
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboFieldMapping.objects.all(), info)
 
     def resolve_kobo_field_mapping(self, info, id):
         self.check_permissions(info, 'kobo_connect.view_kobofieldmapping')
-        return KoboFieldMapping.objects.get(pk=id)
+        self.check_query_depth(info)
+        return gql_optimizer.query(KoboFieldMapping.objects.filter(pk=id), info).get()
 
     def check_permissions(self, info, permission):
-        if not info.context.user.has_perm(permission):
-            raise PermissionDenied(_("Unauthorized"))
+        # Kept as a safety net when KoboPermMiddleware is not registered by the host;
+        # the result is memoized on the request, so a prior middleware check makes it free
+        check_perms(info, permission)
+
+    def check_query_depth(self, info):
+        # Caps nested traversals such as koboForms > syncLogs > koboForm > syncLogs > ...
+        # (the field itself counts as the first level)
+        depth = 1 + selection_depth(info.field_asts[0].selection_set, info.fragments)
+        if depth > KoboConnectConfig.gql_query_max_depth:
+            raise GraphQLError(_("Query is too deep (%(depth)s > %(max)s)") % {
+                'depth': depth, 'max': KoboConnectConfig.gql_query_max_depth})
 
 
 # End of file
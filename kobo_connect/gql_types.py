@@ -1,9 +1,44 @@
 import graphene
+import graphene_django_optimizer as gql_optimizer
 from graphene_django import DjangoObjectType
-from django.core.exceptions import PermissionDenied
-from django.utils.translation import gettext as _
+from graphql.language import ast
+from .loaders import get_loader
 from .models import KoboForm, KoboToken, KoboSyncLog, KoboFieldMapping
-from django.contrib.auth.models import User
+from .util import has_perms_cached, underscore_to_camel
+
+
+def _iter_fields(selection_set, fragments):
+    for selection in (selection_set.selections if selection_set else ()):
+        if isinstance(selection, ast.FragmentSpread):
+            yield from _iter_fields(fragments[selection.name.value].selection_set, fragments)
+        elif isinstance(selection, ast.InlineFragment):
+            yield from _iter_fields(selection.selection_set, fragments)
+        else:
+            yield selection
+
+
+def selection_depth(selection_set, fragments):
+    fields = list(_iter_fields(selection_set, fragments))
+    if not fields:
+        return 0
+    return 1 + max(selection_depth(f.selection_set, fragments) for f in fields)
+
+
+def _requested_fields(info):
+    # Names requested on the object itself, looking through edges { node { ... } } for connections
+    fields = list(_iter_fields(info.field_asts[0].selection_set, info.fragments))
+    for wrapper in ('edges', 'node'):
+        wrapped = [f for f in fields if f.name.value == wrapper]
+        if not wrapped:
+            break
+        fields = [child for f in wrapped for child in _iter_fields(f.selection_set, info.fragments)]
+    return {f.name.value for f in fields}
+
+
+def _defer_unrequested(queryset, info, heavy_fields):
+    requested = _requested_fields(info)
+    deferred = [name for name in heavy_fields if underscore_to_camel(name) not in requested]
+    return queryset.defer(*deferred) if deferred else queryset
 
 
 class KoboFormGQLType(DjangoObjectType):
@@ -13,22 +48,32 @@ class KoboFormGQLType(DjangoObjectType):
         filter_fields = {
             "id": ["exact", "isnull"],
             "name": ["exact", "istartswith", "icontains", "iexact"],
-            "kobo_uid": ["exact", "isnull"],
+            "kobo_uid": ["exact", "isnull", "in"],
             "api_key": ["exact", "isnull"],
             "user": ["exact", "isnull"],
-            "auto_sync": ["exact", "istartswith", "icontains", "iexact"],
-            "sync_interval": ["exact", "istartswith", "icontains", "iexact"],
+            "auto_sync": ["exact"],
+            "sync_interval": ["exact", "lt", "lte", "gt", "gte"],
         }
         description = "Type for Kobo forms in the system"
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return _defer_unrequested(queryset, info, ("description",))
+
+    def resolve_user(self, info):
+        return get_loader(info, 'user').load(self.user_id)
+
+    def resolve_api_key(self, info):
+        return get_loader(info, 'token').load(self.api_key_id)
+
     @classmethod
     def get_node(cls, info, id):
-        try:
-            kobo_form = cls._meta.model.objects.get(id=id)
-        except cls._meta.model.DoesNotExist:
+        queryset = cls.get_queryset(cls._meta.model.objects.filter(id=id), info)
+        kobo_form = gql_optimizer.query(queryset, info).first()
+        if kobo_form is None:
             return None
 
-        if info.context.user.has_perm("kobo_connect.view_koboform"):
+        if has_perms_cached(info, "kobo_connect.view_koboform"):
             return kobo_form
         return None
 
@@ -59,6 +104,10 @@ class KoboSyncLogGQLType(DjangoObjectType):
         }
         description = "Type for Kobo synchronization logs"
 
+    @classmethod
+    def get_queryset(cls, queryset, info):
+        return _defer_unrequested(queryset, info, ("error_message", "details"))
+
 
 
 class KoboFieldMappingGQLType(DjangoObjectType):
@@ -0,0 +1,39 @@
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from core.models import User
+from .models import KoboToken
+
+
+class _ModelLoader(DataLoader):
+    """Batches the primary-key lookups of one GraphQL request into a single IN query."""
+    model = None
+
+    def batch_load_fn(self, ids):
+        objects = self.model.objects.in_bulk(set(ids))
+        return Promise.resolve([objects.get(pk) for pk in ids])
+
+
+class UserLoader(_ModelLoader):
+    model = User
+
+
+class KoboTokenLoader(_ModelLoader):
+    model = KoboToken
+
+
+LOADERS = {
+    'user': UserLoader,
+    'token': KoboTokenLoader,
+}
+
+
+def get_loader(info, name):
+    # Loaders are created once per request and kept on the context, so their cache never
+    # outlives the request (and never leaks data between users)
+    loaders = getattr(info.context, 'kobo_loaders', None)
+    if loaders is None:
+        loaders = info.context.kobo_loaders = {}
+    if name not in loaders:
+        loaders[name] = LOADERS[name]()
+    return loaders[name]
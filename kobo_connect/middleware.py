@@ -0,0 +1,32 @@
+from .util import check_perms
+
+# Top-level GraphQL fields of this module and the permission they require
+# (graphql-core reports the schema name of the field, hence the camelCase keys)
+PERM_MAP = {
+    'koboForms': 'kobo_connect.view_koboform',
+    'koboForm': 'kobo_connect.view_koboform',
+    'koboTokens': 'kobo_connect.view_kobotoken',
+    'koboToken': 'kobo_connect.view_kobotoken',
+    'koboSyncLogs': 'kobo_connect.view_kobosynclog',
+    'koboSyncLog': 'kobo_connect.view_kobosynclog',
+    'koboFieldMappings': 'kobo_connect.view_kobofieldmapping',
+    'koboFieldMapping': 'kobo_connect.view_kobofieldmapping',
+}
+
+
+class KoboPermMiddleware:
+    """
+    Checks the permissions of the kobo_connect queries once, at the query entry point,
+    before any resolver of the requested tree runs. Nested fields (root is not None) only
+    cost the `root is None` test.
+    """
+
+    def resolve(self, next_, root, info, **args):
+        if root is None:
+            perm = PERM_MAP.get(info.field_name)
+            if perm is not None:
+                check_perms(info, perm)
+        return next_(root, info, **args)
+
+
+# End of file
@@ -1,10 +1,6 @@
-from django.conf import settings
 from django.db import models
 from core import models as core_models
-from core.models import HistoryBusinessModel, User, HistoryModel
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.contrib.contenttypes.models import ContentType
-from graphql import ResolveInfo
+from core.models import HistoryBusinessModel, User
 
 
 class KoboToken(HistoryBusinessModel):
@@ -27,6 +23,13 @@ class KoboForm(HistoryBusinessModel):
     auto_sync = models.BooleanField(default=False)
     sync_interval = models.IntegerField(null=True, blank=True)  # interval in minutes
     last_sync_date = models.DateTimeField(null=True, blank=True)
+    page_size = models.PositiveIntegerField(default=2000)  # submissions per KPI page (max 10000)
+
+    class Meta:
+        indexes = [
+            # Sélection par le scheduler des formulaires à synchroniser
+            models.Index(fields=['auto_sync', 'last_sync_date'], name='koboform_autosync_idx'),
+        ]
 
     def __str__(self):
         return f"Sync Settings for {self.name} by {self.user.username}"
@@ -41,6 +44,13 @@ class KoboSyncLog(HistoryBusinessModel):
     error_message = models.TextField(null=True, blank=True)
     details = models.TextField(null=True, blank=True)  # Ex: "Ticket code: TK-001"
 
+    class Meta:
+        indexes = [
+            # "Dernier log par formulaire" (admin, GraphQL) : parcours d'index plutôt que tri
+            models.Index(fields=['kobo_form', '-sync_date'], name='synclog_form_date_idx'),
+            models.Index(fields=['status'], condition=models.Q(status='failed'), name='synclog_failed_partial_idx'),
+        ]
+
     def __str__(self):
         return f"status {self.status}"
 
@@ -51,6 +61,13 @@ class KoboFieldMapping(HistoryBusinessModel):
     kobo_field = models.CharField(max_length=255)
     grievance_field = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Lecture du mapping d'un formulaire à chaque sync (non unique : un champ Kobo
+            # peut alimenter plusieurs cibles, ex. un champ direct et une copie dans json_ext)
+            models.Index(fields=['kobo_form', 'kobo_field'], name='kobomapping_form_field_idx'),
+        ]
+
 
 
 class KoboFormMutation(core_models.UUIDModel, core_models.ObjectMutation):
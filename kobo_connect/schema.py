@@ -1,10 +1,4 @@
 import graphene
-import graphene_django_optimizer as gql_optimizer
-from django.utils.translation import gettext_lazy as _
-
-from core.schema import OrderedDjangoFilterConnectionField
-# from .gql_queries import *
-
 
 from .gql_mutations import (
     CreateKoboTokenMutation, UpdateKoboTokenMutation, DeleteKoboTokenMutation,
@@ -13,10 +7,6 @@ from .gql_mutations import (
     CreateKoboFieldMappingMutation, UpdateKoboFieldMappingMutation, DeleteKoboFieldMappingMutation
 )
 
-
-from .models import KoboToken, KoboForm
-from django.contrib.auth.models import AnonymousUser
-from core.utils import append_validity_filter
 from .gql_queries import Query as KoboConnectQuery
 
 
@@ -43,7 +33,18 @@ class Query(KoboConnectQuery, graphene.ObjectType):
     pass
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+_schema = None
+
+
+def __getattr__(name):
+    # openIMIS merges the Query/Mutation classes of every module into the host schema, so this
+    # standalone schema is only built (once per process) when something actually asks for it
+    global _schema
+    if name == 'schema':
+        if _schema is None:
+            _schema = graphene.Schema(query=Query, mutation=Mutation)
+        return _schema
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Add this extra blank line
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import KoboToken
+
+# Envoyé par start_sync() une fois chaque lot validé (transaction.on_commit), avec kobo_form,
+# created et updated (listes des tickets écrits) : les créations/mises à jour groupées
+# n'émettent pas post_save
+kobo_batch_synced = Signal()
+
+
+@receiver(post_save, sender=KoboToken)
+@receiver(post_delete, sender=KoboToken)
+def _clear_kobo_clients(sender, **kwargs):
+    # Oublie les clients des tokens modifiés ou supprimés (les autres process expirent par TTL)
+    from .synchronizer import kobo_client_cache_clear
+    kobo_client_cache_clear()
@@ -1,17 +1,29 @@
+import hashlib
+import inspect
+import json
 import logging
+import queue
 import re
-from copy import deepcopy
-from dataclasses import dataclass
-from datetime import timedelta
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime as py_datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from django.apps import apps
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import transaction, models as djm
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from .models import KoboToken, KoboForm, KoboFieldMapping, KoboSyncLog
+from .signals import kobo_batch_synced
+from .util import history_update_fields
+from grievance_social_protection.apps import TicketConfig
 from grievance_social_protection.escalation_services import next_due_date, bootstrap_escalation_fields
 
 logger = logging.getLogger(__name__)
@@ -21,11 +33,22 @@ logger = logging.getLogger(__name__)
 # Helpers: Label resolver for select_one / select_multiple
 # ---------------------------------------------------------------------------
 
-def _norm_lang_key(s: str) -> str:
-    import unicodedata
+_LANG_STRIP_RE = re.compile(r"[\s()]+")
+_MULTI_SEP_RE = re.compile(r"[,\s]+")
+
+
+def _without_accents(s: str) -> str:
+    # Chemin rapide : une chaîne ASCII n'a ni décomposition NFKD ni marque combinante
+    if s.isascii():
+        return s
     s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    return re.sub(r"[\s()]+", "", s).lower()
+    return "".join(c for c in s if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=4096)
+def _norm_lang_key(s: str) -> str:
+    # Peu de valeurs distinctes (noms de langue des assets), appelée pour chaque label
+    return _LANG_STRIP_RE.sub("", _without_accents(s)).lower()
 
 
 def _pick_lang(label_obj, pref_lang: Optional[str]):
@@ -99,20 +122,30 @@ def _build_choice_resolver(client, asset_uid: str, lang: Optional[str] = None):
         if qname and ln:
             field_to_list[qname] = ln
 
-    logger.debug("[Kobo Label] field_to_list: %s", field_to_list)
-    logger.debug("[Kobo Label] lists: %s", {k: len(v) for k, v in list_to_labels.items()})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[Kobo Label] field_to_list: %s", field_to_list)
+        logger.debug("[Kobo Label] lists: %s", {k: len(v) for k, v in list_to_labels.items()})
+
+    # nom de question -> table des labels, puis chemin Kobo complet -> table (calculé au premier appel)
+    leaf_to_lut: Dict[str, Dict[str, str]] = {leaf: list_to_labels.get(ln, {}) for leaf, ln in field_to_list.items()}
+    lut_by_key: Dict[str, Optional[Dict[str, str]]] = {}
+
+    def lut_for(kobo_key: str) -> Optional[Dict[str, str]]:
+        try:
+            return lut_by_key[kobo_key]
+        except KeyError:
+            lut = lut_by_key[kobo_key] = leaf_to_lut.get(kobo_key.rsplit("/", 1)[-1])
+            return lut
 
     def resolve(kobo_key: str, raw_val):
-        leaf = kobo_key.split("/")[-1]
-        ln = field_to_list.get(leaf)
-        if not ln:
+        lut = lut_for(kobo_key)
+        if lut is None:
             return raw_val  # pas une question select_*
-        lut = list_to_labels.get(ln, {})
         # multi-select
         if isinstance(raw_val, list):
             codes = raw_val
         elif isinstance(raw_val, str):
-            codes = re.split(r"[,\s]+", raw_val.strip())
+            codes = _MULTI_SEP_RE.split(raw_val.strip())
             codes = [c for c in codes if c]
         else:
             codes = None
@@ -121,15 +154,51 @@ def _build_choice_resolver(client, asset_uid: str, lang: Optional[str] = None):
         # select_one
         return lut.get(str(raw_val), raw_val)
 
+    # Permet d'écarter une fois pour toutes (au plan de mapping) les champs texte libre
+    resolve.is_select = lambda kobo_key: lut_for(kobo_key) is not None
     return resolve
 
 
+_resolver_cache: Dict[Tuple[str, str, Optional[str]], Tuple[float, Any]] = {}
+_resolver_cache_lock = threading.Lock()
+
+
+def _label_resolver(client, asset_uid: str):
+    """Résolveur de labels de l'asset, ou None (valeurs brutes) si le contenu est indisponible.
+    Mis en cache ASSET_CACHE_TTL secondes par (URL, asset, langue) : le contenu d'un asset change
+    rarement, sync_one() et les syncs planifiées évitent ainsi le GET assets/{uid}/ et son analyse.
+    """
+    key = (client.base_url, asset_uid, LABEL_LANG)
+    with _resolver_cache_lock:
+        hit = _resolver_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < ASSET_CACHE_TTL:
+        return hit[1]
+    try:
+        resolver = _build_choice_resolver(client, asset_uid, lang=LABEL_LANG)
+    except Exception as e:
+        logger.warning("[Kobo Label] Désactivé: %s", e)
+        return None
+    with _resolver_cache_lock:
+        _resolver_cache[key] = (time.monotonic(), resolver)
+    return resolver
+
+
+def kobo_asset_cache_clear() -> None:
+    """Oublie les résolveurs de labels en cache (ex. après republication d'un formulaire)."""
+    with _resolver_cache_lock:
+        _resolver_cache.clear()
+
+
+_TRUE_STRINGS = frozenset(("oui", "yes", "true", "1"))
+_FALSE_STRINGS = frozenset(("non", "no", "false", "0"))
+
+
 def _coerce_bool_fr(value: Any) -> Any:
     if isinstance(value, str):
-        v = value.strip().lower()
-        if v in ("oui", "yes", "true", "1"):
+        v = value.strip().casefold()
+        if v in _TRUE_STRINGS:
             return True
-        if v in ("non", "no", "false", "0"):
+        if v in _FALSE_STRINGS:
             return False
     return value
 
@@ -139,8 +208,16 @@ def _coerce_bool_fr(value: Any) -> Any:
 # ---------------------------------------------------------------------------
 API_PREFIX = "/api/v2"
 REQUEST_TIMEOUT = 60          # secondes
-PAGE_SIZE = 1000              # éléments par page KPI
+PAGE_SIZE = 2000              # éléments par page KPI (défaut de KoboForm.page_size)
+MAX_PAGE_SIZE = 10000         # au-delà, les serveurs KPI répondent souvent en 502
 BACKOFF_MINUTES = 1           # marge pour éviter les “bords” temporels
+LABEL_LANG = "fr"             # langue des labels select_* (ou "French" selon les assets)
+ASSET_CACHE_TTL = 300         # secondes de réutilisation du résolveur de labels d'un asset
+HTTP_POOL_SIZE = 32           # connexions HTTP par hôte Kobo (défaut de settings.KOBO_HTTP_POOL_SIZE)
+HTTP_RETRIES = 3              # nouvelles tentatives d'un GET KPI en échec transitoire
+CLIENT_CACHE_TTL = 600        # secondes de réutilisation d'un KoboClient
+SYNC_BATCH_SIZE = 500         # soumissions traitées par lot (pré-chargement des tickets)
+ROW_DIGEST_TTL = 30 * 86400   # secondes de conservation de l'empreinte d'une soumission (sync_one)
 
 # Ticket (module plainte/grievance)
 try:
@@ -148,20 +225,95 @@ try:
 except Exception:  # pragma: no cover
     Ticket = apps.get_model("grievance_social_protection", "Ticket")  # type: ignore
 
+# Créations / mises à jour groupées avec historique (simple_history, dépendance de core)
+try:
+    from simple_history.utils import bulk_create_with_history, bulk_update_with_history  # type: ignore
+except Exception:  # pragma: no cover
+    bulk_create_with_history = bulk_update_with_history = None  # type: ignore
+
 # Location
 try:
     from location.models import Location  # type: ignore
 except Exception:  # pragma: no cover
     Location = None  # type: ignore
 
+# Sérialisation rapide des soumissions pour leur empreinte
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
 
 # ---------------------------------------------------------------------------
 # Client Kobo KPI v2
 # ---------------------------------------------------------------------------
+def _http_pool_size() -> int:
+    """Taille du pool de connexions par hôte Kobo. La session est partagée par tous les threads
+    du process : chaque sync en cours utilise une connexion pour son thread et une pour son
+    thread de lecture anticipée (_read_ahead), d'où 2 × la concurrence du worker.
+    settings.KOBO_HTTP_POOL_SIZE l'emporte ; sinon 2 × CELERY_WORKER_CONCURRENCY si défini.
+    """
+    from django.conf import settings
+    size = getattr(settings, "KOBO_HTTP_POOL_SIZE", None)
+    if not size:
+        concurrency = getattr(settings, "CELERY_WORKER_CONCURRENCY", None)
+        size = 2 * int(concurrency) if concurrency else HTTP_POOL_SIZE
+    return max(1, int(size))
+
+
+def _new_http_session():
+    """Session requests avec pool de connexions : TCP + TLS réutilisés d'un appel KPI à l'autre.
+    Les GET en échec transitoire (502/503/504, coupure) sont rejoués avec backoff exponentiel.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,  # la dernière réponse est remontée par raise_for_status()
+    )
+    pool_size = _http_pool_size()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_shared_session: Any = None
+_shared_session_lock = threading.Lock()
+
+
+def _http_session():
+    """Session HTTP unique du process, partagée par tous les KoboClient : un formulaire, un token
+    ou une sync de plus sur le même serveur Kobo réutilise les connexions déjà ouvertes.
+    L'authentification est passée à chaque requête et les cookies ne sont pas conservés, pour
+    qu'aucun état ne passe d'un token à l'autre.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            from http.cookiejar import DefaultCookiePolicy
+            session = _new_http_session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            _shared_session = session
+        return _shared_session
+
+
 @dataclass
 class KoboClient:
     base_url: str
     token: str
+    session: Any = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.session is None:
+            self.session = _http_session()
+        # En-têtes construits une fois (pas dans session.headers : une session peut être partagée)
+        self._auth_headers = self._headers()
 
     def _headers(self) -> Dict[str, str]:
         return {"Authorization": f"Token {self.token}", "Accept": "application/json"}
@@ -170,47 +322,97 @@ class KoboClient:
         return f"{self.base_url.rstrip('/')}{API_PREFIX}/{path.lstrip('/')}"
 
     def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        import requests, json as _json
         url = self._abs(path)
         params = dict(params or {})
         params.setdefault("format", "json")
-        r = requests.get(url, headers=self._headers(), params=params, timeout=REQUEST_TIMEOUT)
+        r = self.session.get(url, headers=self._auth_headers, params=params, timeout=REQUEST_TIMEOUT)
         r.raise_for_status()
         try:
             return r.json()
         except ValueError:
             text = r.text.lstrip("\ufeff").strip()
-            return _json.loads(text)
-
-    def iter_submissions(self, asset_uid: str, page_size: int = PAGE_SIZE) -> Iterable[Dict[str, Any]]:
-        """Itère toutes les soumissions pour un asset (UID) avec pagination."""
-        import requests
+            return json.loads(text)
+
+    def iter_pages(
+        self,
+        asset_uid: str,
+        page_size: int = PAGE_SIZE,
+        start: int = 0,
+        query: Optional[Dict[str, Any]] = None,
+    ) -> Iterable[List[Dict[str, Any]]]:
+        """Itère les pages de soumissions d'un asset (UID) : une seule page en mémoire à la fois.
+        `start` : décalage de la première soumission (reprise d'une collecte interrompue).
+        `query` : filtre Mongo appliqué par KPI (ex. {"_submission_time": {"$gte": ...}}).
+        """
         url = self._abs(f"assets/{asset_uid}/data/")
+        page_size = max(1, min(int(page_size or PAGE_SIZE), MAX_PAGE_SIZE))
         params: Optional[Dict[str, Any]] = {"format": "json", "limit": page_size}
+        if start:
+            params["start"] = start
+        if query:
+            params["query"] = json.dumps(query, separators=(",", ":"))
         while url:
-            r = requests.get(url, headers=self._headers(), params=params, timeout=REQUEST_TIMEOUT)
+            r = self.session.get(url, headers=self._auth_headers, params=params, timeout=REQUEST_TIMEOUT)
             r.raise_for_status()
             payload = r.json()
-            for row in payload.get("results", []):
-                yield row
+            yield payload.get("results", [])
             url = payload.get("next")
             params = None  # les URLs "next" sont absolues
 
+    def iter_submissions(self, asset_uid: str, page_size: int = PAGE_SIZE) -> Iterable[Dict[str, Any]]:
+        """Itère toutes les soumissions pour un asset (UID) avec pagination."""
+        for page in self.iter_pages(asset_uid, page_size=page_size):
+            yield from page
+
     def get_submission(self, asset_uid: str, submission_id: Any) -> Optional[Dict[str, Any]]:
-        """Récupère UNE soumission. Selon l'instance, l'endpoint /data/{id}/ peut être disponible."""
-        import requests
+        """Récupère UNE soumission. Selon l'instance, l'endpoint /data/{id}/ peut être disponible ;
+        sinon la liste paginée est interrogée avec un filtre `query` sur _id (ou _uuid).
+        """
         url = self._abs(f"assets/{asset_uid}/data/{submission_id}/")
         try:
-            r = requests.get(url, headers=self._headers(), params={"format": "json"}, timeout=REQUEST_TIMEOUT)
-            if r.status_code == 404:
-                return None
-            r.raise_for_status()
-            return r.json()
+            r = self.session.get(url, headers=self._auth_headers, params={"format": "json"}, timeout=REQUEST_TIMEOUT)
+            if r.status_code != 404:
+                r.raise_for_status()
+                return r.json()
         except Exception:
             logger.warning("[KPI] get_submission: endpoint unitaire non disponible")
+        sid = str(submission_id)
+        query = {"_id": int(sid)} if sid.isdigit() else {"_uuid": sid}
+        try:
+            return next((row for page in self.iter_pages(asset_uid, page_size=1, query=query) for row in page), None)
+        except Exception:
+            logger.warning("[KPI] get_submission: échec de la recherche filtrée de %s", submission_id)
             return None
 
 
+_client_cache: Dict[Tuple[str, str], Tuple[float, KoboClient]] = {}
+_client_cache_lock = threading.Lock()
+
+
+def _client_for(base_url: str, api_key: str) -> KoboClient:
+    """KoboClient partagé par (URL, clé), sur la session HTTP du process (_http_session).
+    Expire après CLIENT_CACHE_TTL. Une clé modifiée donne une nouvelle entrée : le cache ne sert
+    jamais un ancien token.
+    """
+    key = (base_url, api_key)
+    now = time.monotonic()
+    with _client_cache_lock:
+        hit = _client_cache.get(key)
+        if hit is not None and now - hit[0] < CLIENT_CACHE_TTL:
+            return hit[1]
+        client = KoboClient(base_url=base_url, token=api_key)
+        _client_cache[key] = (now, client)
+    return client
+
+
+def kobo_client_cache_clear() -> None:
+    """Vide le cache des clients (appelée à la modification / suppression d'un KoboToken).
+    La session partagée reste ouverte : elle ne porte aucun token.
+    """
+    with _client_cache_lock:
+        _client_cache.clear()
+
+
 # ---------------------------------------------------------------------------
 # Utilitaires de dates / booléens / logs / mapping
 # ---------------------------------------------------------------------------
@@ -220,20 +422,15 @@ def _parse_ts(value: Any) -> Optional[timezone.datetime]:
         return None
     if isinstance(value, timezone.datetime):
         return value if timezone.is_aware(value) else timezone.make_aware(value)
-    dt = parse_datetime(str(value))
-    if dt is None:
-        return None
-    return dt if timezone.is_aware(dt) else timezone.make_aware(dt)
-
-
-def _bool_fr(value: Any) -> Any:
-    if isinstance(value, str):
-        v = value.strip().lower()
-        if v in ("oui", "yes", "true", "1"):
-            return True
-        if v in ("non", "no", "false", "0"):
-            return False
-    return value
+    # Chemin rapide (implémenté en C) pour l'ISO 8601 des horodatages Kobo, décalage et
+    # fractions de seconde compris ; parse_datetime() pour les autres formats
+    try:
+        dt = py_datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        dt = parse_datetime(str(value))
+        if dt is None:
+            return None
+    return dt if dt.tzinfo is not None else timezone.make_aware(dt)
 
 
 def should_sync(form: KoboForm) -> bool:
@@ -249,6 +446,43 @@ def should_sync(form: KoboForm) -> bool:
     return timezone.now() - last >= timedelta(minutes=interval)
 
 
+def forms_due_for_sync(now: Optional[timezone.datetime] = None):
+    """Équivalent SQL de should_sync() : les formulaires à synchroniser, filtrés par la base
+    (index koboform_autosync_idx) au lieu d'être chargés puis testés un à un en Python.
+    """
+    now = now or timezone.now()
+    # output_field explicite sur le produit : sans type durée natif (SQLite, SQL Server), Django
+    # compilerait sinon l'addition comme une simple somme numérique
+    interval = djm.ExpressionWrapper(
+        djm.Value(timedelta(minutes=1)) * djm.F("sync_interval"),
+        output_field=djm.DurationField(),
+    )
+    next_sync = djm.ExpressionWrapper(djm.F("last_sync_date") + interval, output_field=djm.DateTimeField())
+    return (
+        KoboForm.objects.filter(auto_sync=True)
+        .annotate(_next_sync=next_sync)
+        .filter(
+            djm.Q(last_sync_date__isnull=True)
+            | djm.Q(sync_interval__isnull=True)
+            | djm.Q(sync_interval__lte=0)
+            | djm.Q(_next_sync__lte=now)
+        )
+    )
+
+
+def _submitted_since_query(since: Optional[timezone.datetime]) -> Optional[Dict[str, Any]]:
+    """Filtre KPI `query` sur _submission_time (chaîne sans décalage).
+    `since` est exprimé sur l'horloge de _parse_ts(), qui lit ces chaînes naïves dans le fuseau
+    courant (last_sync_date est stocké ainsi) : il est reformaté dans ce même fuseau, pour que le
+    filtre serveur et le filtrage par ligne comparent les mêmes valeurs.
+    """
+    if not since:
+        return None
+    if timezone.is_aware(since):
+        since = timezone.localtime(since)
+    return {"_submission_time": {"$gte": since.strftime("%Y-%m-%dT%H:%M:%S")}}
+
+
 def _get_token(form: KoboForm) -> KoboToken:
     token_obj = getattr(form, "kobo_token", None) or getattr(form, "api_key", None)
     if not isinstance(token_obj, KoboToken):
@@ -264,12 +498,23 @@ def _get_uid(form: KoboForm) -> str:
 
 
 def _build_mapping(form: KoboForm) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
-    """Retourne: (direct_map, extras_map) à partir de KoboFieldMapping."""
+    """Retourne: (direct_map, extras_map) à partir de KoboFieldMapping.
+    Utilise les mappings pré-chargés (prefetch_related("field_mappings")) s'ils sont présents.
+    """
     direct_map: Dict[str, str] = {}
     extras_map: List[Tuple[str, str]] = []
-    for m in KoboFieldMapping.objects.filter(kobo_form=form).iterator():
-        source = (m.kobo_field or "").strip()
-        target = (m.grievance_field or "").strip()
+    if "field_mappings" in getattr(form, "_prefetched_objects_cache", {}):
+        pairs = ((m.kobo_field, m.grievance_field) for m in form.field_mappings.all())
+    else:
+        # Tuples plutôt qu'instances (HistoryModel) : seules ces deux colonnes sont lues
+        pairs = (
+            KoboFieldMapping.objects.filter(kobo_form=form)
+            .values_list("kobo_field", "grievance_field")
+            .iterator(chunk_size=500)
+        )
+    for kobo_field, grievance_field in pairs:
+        source = (kobo_field or "").strip()
+        target = (grievance_field or "").strip()
         if not source or not target:
             continue
         if target.startswith("json_ext"):
@@ -279,25 +524,42 @@ def _build_mapping(form: KoboForm) -> Tuple[Dict[str, str], List[Tuple[str, str]
     return direct_map, extras_map
 
 
-def _dot_set(d: Dict[str, Any], dotted: str, value: Any) -> None:
-    """Affecte une valeur dans un dict imbriqué via un chemin en pointillés."""
-    parts = dotted.split(".")
-    cur = d
-    for i, p in enumerate(parts):
-        if i == len(parts) - 1:
-            cur[p] = value
-        else:
-            if p not in cur or not isinstance(cur[p], dict):
-                cur[p] = {}
-            cur = cur[p]
+def _dot_set(d: Dict[str, Any], dotted: str, value: Any, copied: Optional[set] = None) -> bool:
+    """Affecte une valeur dans un dict imbriqué via un chemin en pointillés ; True si `d` a changé.
+    `copied` : id des dicts déjà copiés pour cette écriture. Les dicts intermédiaires qui n'y sont
+    pas sont copiés avant modification (copie sur écriture) : l'original n'est jamais muté.
+    """
+    return _dot_set_parts(d, dotted.split("."), value, copied)
 
 
-def _save_log(form: KoboForm, user, status: str, action: str, message: str = "", details: Any = None) -> KoboSyncLog:
+def _dot_set_parts(d: Dict[str, Any], parts: Sequence[str], value: Any, copied: Optional[set] = None) -> bool:
+    """_dot_set() pour un chemin déjà découpé (voir _compile_extras_map)."""
+    *parents, leaf = parts
+    cur = d
+    changed = False
+    for p in parents:
+        nxt = cur.get(p)
+        if not isinstance(nxt, dict):
+            nxt = cur[p] = {}
+            changed = True
+        elif copied is not None and id(nxt) not in copied:
+            nxt = cur[p] = dict(nxt)
+        if copied is not None:
+            copied.add(id(nxt))
+        cur = nxt
+    if leaf in cur and cur[leaf] == value:
+        return changed
+    cur[leaf] = value
+    return True
+
+
+def _log_values(status: str, action: str, message: str = "", details: Any = None) -> Dict[str, Any]:
+    """Valeurs d'un KoboSyncLog (seuls les champs existants du modèle sont retenus)."""
     valid = {"success", "failed"}
     if status not in valid:
         status = "failed" if status in {"error"} else "success"
 
-    log = KoboSyncLog(kobo_form=form)
+    values: Dict[str, Any] = {}
     for name, val in (
         ("status", status),
         ("action", action),
@@ -306,52 +568,146 @@ def _save_log(form: KoboForm, user, status: str, action: str, message: str = "",
         ("details", details),
         ("payload", details),
     ):
-        if hasattr(log, name) and val is not None:
-            setattr(log, name, val)
-    try:
-        log.save(user=user)
-    except TypeError:
-        log.save()
+        if hasattr(KoboSyncLog, name) and val is not None:
+            values[name] = val
+    return values
+
+
+@lru_cache(maxsize=None)
+def _save_takes_user(model) -> bool:
+    """True si model.save() accepte `user=` (HistoryModel) ; déterminé une fois par classe."""
+    params = inspect.signature(model.save).parameters
+    return "user" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+
+def _save(obj, user, **kwargs) -> None:
+    """obj.save(user=user, ...) si la signature le permet, sinon obj.save(...)."""
+    if _save_takes_user(type(obj)):
+        obj.save(user=user, **kwargs)
+    else:
+        obj.save(**kwargs)
+
+
+def _save_log(form: KoboForm, user, status: str, action: str, message: str = "", details: Any = None) -> KoboSyncLog:
+    log = KoboSyncLog(kobo_form=form, **_log_values(status, action, message, details))
+    _save(log, user)
     return log
 
 
+def _resolve_user(user):
+    """Utilisateur d'audit de la sync, résolu une seule fois.
+    Sans utilisateur, HistoryModel.save() refait la recherche du compte par défaut à chaque save.
+    """
+    if user or not hasattr(KoboSyncLog, "get_user"):
+        return user
+    return KoboSyncLog().get_user()
+
+
+class _LogBuffer:
+    """Logs KoboSyncLog accumulés pendant une sync et écrits en une fois (INSERT multi-lignes +
+    historique) par flush(), appelé en fin de lot et en cas d'erreur.
+    Les logs de début et de fin restent écrits immédiatement par _save_log().
+    """
+
+    def __init__(self, form: KoboForm, user):
+        self.form = form
+        # bulk_save n'applique pas le repli de HistoryModel.save() sur l'utilisateur par défaut
+        self.user = _resolve_user(user)
+        self.pending: List[Dict[str, Any]] = []
+
+    def append(self, status: str, action: str, message: str = "", details: Any = None) -> None:
+        self.pending.append(_log_values(status, action, message, details))
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        KoboSyncLog.bulk_save(
+            [dict(values, kobo_form=self.form) for values in self.pending], self.user, batch_size=SYNC_BATCH_SIZE
+        )
+        self.pending.clear()
+
+
 # ---------------------------------------------------------------------------
 # Résolution d'entités liées : Location, User, etc.
 # ---------------------------------------------------------------------------
 
-def _resolve_location_from_row(row: Dict[str, Any]) -> Optional[Any]:
+LOCATION_CODE_KEYS = [
+    "group_geo/group_prefecture/district_code",
+    "group_geo/group_prefecture/sous_prefecture_code",
+    "group_geo/group_prefecture/prefecture_code",
+    "group_geo/group_prefecture/region_code",
+]
+LOCATION_NAME_KEYS = [
+    "group_geo/group_prefecture/district",
+    "group_geo/group_prefecture/sous_prefecture",
+    "group_geo/group_prefecture/prefecture",
+    "group_geo/group_prefecture/region",
+]
+
+
+def _location_keys(row: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Clés normalisées (ordre de priorité : codes puis libellés) des lieux cités dans une ligne.
+    Les valeurs sont nettoyées des espaces, les libellés mis en minuscules : les variantes de
+    saisie ("Conakry ", "CONAKRY") tombent sur la même entrée de cache et la même recherche.
+    """
+    keys = []
+    for k in LOCATION_CODE_KEYS:
+        v = str(row.get(k) or "").strip()
+        if v:
+            keys.append(("code", v))
+    for k in LOCATION_NAME_KEYS:
+        v = str(row.get(k) or "").strip().lower()
+        if v:
+            keys.append(("name", v))
+    return keys
+
+
+def _prefetch_locations(rows: List[Dict[str, Any]], index: Dict[Tuple[str, str], Any]) -> None:
+    """Complète `index` {("code", code) | ("name", nom en minuscules): Location ou None}
+    avec les valeurs du lot encore inconnues : UNE requête (codes OR libellés) par lot au lieu de 8 par ligne.
+    L'index est conservé sur toute la sync (les mêmes lieux reviennent d'un lot à l'autre).
+    """
+    if Location is None:
+        return
+    from django.db.models.functions import Lower
+
+    missing = {key for row in rows for key in _location_keys(row) if key not in index}
+    codes = {v for kind, v in missing if kind == "code"}
+    names = {v for kind, v in missing if kind == "name"}
+    cond = djm.Q()
+    if codes:
+        cond |= djm.Q(code__in=codes)
+    if names:
+        cond |= djm.Q(_kobo_lname__in=names)
+    if cond:
+        try:
+            qs = Location.objects.annotate(_kobo_lname=Lower("name")).filter(cond).order_by("id")
+            for loc in qs:
+                if str(loc.code) in codes:
+                    index.setdefault(("code", str(loc.code)), loc)
+                if loc._kobo_lname in names:
+                    index.setdefault(("name", loc._kobo_lname), loc)
+        except Exception:
+            logger.debug("_prefetch_locations: échec du pré-chargement des Locations")
+    # Les valeurs sans correspondance sont mémorisées aussi, pour ne pas les rechercher à nouveau
+    for key in missing:
+        index.setdefault(key, None)
+
+
+def _resolve_location_from_row(row: Dict[str, Any], index: Optional[Dict[Tuple[str, str], Any]] = None) -> Optional[Any]:
     """Tente de retrouver une Location à partir de codes ou libellés présents.
     Retourne None si introuvable. N'assigne rien si le modèle ne possède pas le champ.
+    `index` : cache pré-rempli par _prefetch_locations (sinon construit ici pour la seule ligne).
     """
     if Location is None:
         return None
-    try:
-        code_keys = [
-            "group_geo/group_prefecture/district_code",
-            "group_geo/group_prefecture/sous_prefecture_code",
-            "group_geo/group_prefecture/prefecture_code",
-            "group_geo/group_prefecture/region_code",
-        ]
-        for k in code_keys:
-            v = row.get(k)
-            if v:
-                obj = Location.objects.filter(code=str(v)).first()
-                if obj:
-                    return obj
-        name_keys = [
-            "group_geo/group_prefecture/district",
-            "group_geo/group_prefecture/sous_prefecture",
-            "group_geo/group_prefecture/prefecture",
-            "group_geo/group_prefecture/region",
-        ]
-        for k in name_keys:
-            v = row.get(k)
-            if v:
-                obj = Location.objects.filter(name__iexact=str(v)).first()
-                if obj:
-                    return obj
-    except Exception:
-        logger.debug("_resolve_location_from_row: pas de Location correspondante")
+    if index is None:
+        index = {}
+        _prefetch_locations([row], index)
+    for key in _location_keys(row):
+        obj = index.get(key)
+        if obj is not None:
+            return obj
     return None
 
 
@@ -369,17 +725,159 @@ def _assign_if_changed(instance, field_name: str, new_value) -> bool:
     return False
 
 
+def _assign_fk_if_changed(instance, field_name: str, obj) -> bool:
+    """_assign_if_changed() pour une FK : compare les identifiants (colonne `<champ>_id`) sans
+    charger l'objet actuellement lié, ce qui coûterait un SELECT par ticket existant.
+    """
+    field_obj = _model_field_index(type(instance)).get(field_name)
+    if field_obj is None or not (field_obj.is_relation and field_obj.concrete):
+        return False
+    if getattr(instance, field_obj.attname) != getattr(obj, "pk", None):
+        setattr(instance, field_name, obj)
+        return True
+    return False
+
+
+def _ticket_update_fields(ticket) -> Optional[List[str]]:
+    """Colonnes réellement modifiées d'un ticket existant (+ colonnes d'audit HistoryModel),
+    pour un UPDATE étroit au lieu de la réécriture de toute la ligne. None = sauvegarde complète.
+    """
+    if not hasattr(ticket, "get_dirty_fields"):
+        return None
+    fields = list(ticket.get_dirty_fields(check_relationship=True))
+    if hasattr(ticket, "category") and not ticket.category:
+        fields.append("category")  # Ticket.save() renseigne alors la catégorie par défaut
+    return history_update_fields(fields)
+
+
+def _queue_ticket_update(ticket, user, pending: Dict[Any, Tuple[Any, List[str], Dict[str, Any]]], row) -> bool:
+    """Met en attente la mise à jour d'un ticket existant pour l'UPDATE groupé de fin de lot.
+    Reproduit ce que HistoryModel.save() / Ticket.save() feraient (audit, catégorie par défaut).
+    Retourne False si le ticket doit passer par save() (entité remplacée, modèle sans dirty fields).
+    """
+    fields = _ticket_update_fields(ticket)
+    if fields is None or getattr(ticket, "replacement_uuid", None) is not None:
+        return False
+    if ticket.pk in pending:
+        # Même ticket modifié par plusieurs lignes du lot : un seul UPDATE, une seule version
+        pending[ticket.pk][1].extend(f for f in fields if f not in pending[ticket.pk][1])
+        return True
+    now = py_datetime.now()
+    if hasattr(ticket, "category") and not ticket.category:
+        ticket.category = TicketConfig.default_grievance_type
+    if not getattr(ticket, "user_created_id", None):
+        ticket.user_created = user
+        ticket.date_created = now
+        fields += ["user_created", "date_created"]
+    ticket.date_updated = now
+    ticket.user_updated = user
+    ticket.version = ticket.version + 1
+    pending[ticket.pk] = (ticket, fields, row)
+    return True
+
+
+def _queue_ticket_create(ticket, user, pending: Dict[Any, Tuple[Any, Dict[str, Any]]], row) -> bool:
+    """Met en attente un nouveau ticket pour l'INSERT groupé de fin de lot.
+    Reproduit ce que HistoryModel.save() / Ticket.save() feraient à la création (UUID, audit,
+    catégorie par défaut). Retourne False si le ticket doit passer par save().
+    """
+    if ticket.pk in pending:
+        return True  # déjà en attente, complété par une ligne suivante du lot
+    if user is None or not hasattr(ticket, "set_pk"):
+        return False
+    now = py_datetime.now()
+    if hasattr(ticket, "category") and not ticket.category:
+        ticket.category = TicketConfig.default_grievance_type
+    ticket.set_pk()
+    ticket.user_created = ticket.user_updated = user
+    ticket.date_created = ticket.date_updated = now
+    pending[ticket.pk] = (ticket, row)
+    return True
+
+
+def _flush_ticket_creates(pending, user, row_errors: _LogBuffer) -> Tuple[List[Any], int]:
+    """Écrit les nouveaux tickets en attente : INSERT multi-lignes + lignes d'historique
+    (bulk_create_with_history), avec le même repli ticket par ticket que _flush_ticket_updates().
+    Retourne (tickets créés, nombre d'échecs).
+    """
+    if not pending:
+        return [], 0
+    entries = list(pending.values())
+    pending.clear()
+    try:
+        with transaction.atomic():
+            bulk_create_with_history(
+                [ticket for ticket, _ in entries], Ticket, batch_size=SYNC_BATCH_SIZE, default_user=user
+            )
+        done = entries
+        failed = 0
+    except Exception:
+        logger.exception("[Kobo Sync] Échec de la création groupée, repli ticket par ticket")
+        done, failed = [], 0
+        for entry in entries:
+            ticket, row = entry
+            try:
+                with transaction.atomic():
+                    bulk_create_with_history([ticket], Ticket, default_user=user)
+                done.append(entry)
+            except Exception as inner:
+                failed += 1
+                row_errors.append("failed", "row_error", message=str(inner), details=row)
+    if hasattr(Ticket, "bulk_update_cache"):
+        Ticket.bulk_update_cache([ticket for ticket, _ in done])
+    for ticket, _ in done:
+        try:
+            # Savepoint par ticket : une erreur SQL ici ne doit pas invalider la transaction du lot
+            with transaction.atomic():
+                bootstrap_escalation_fields(ticket)
+        except Exception:
+            logger.exception("[Kobo Sync] bootstrap_escalation_fields a échoué pour %s", getattr(ticket, "code", None))
+    return [ticket for ticket, _ in done], failed
+
+
+def _flush_ticket_updates(pending, user, row_errors: _LogBuffer) -> Tuple[List[Any], int]:
+    """Écrit les tickets en attente : UPDATE multi-lignes + lignes d'historique (bulk_update_with_history).
+    En cas d'échec du lot, repli ticket par ticket (savepoint chacun) pour isoler la ligne fautive.
+    Retourne (tickets mis à jour, nombre d'échecs).
+    """
+    if not pending:
+        return [], 0
+    entries = list(pending.values())
+    pending.clear()
+    try:
+        with transaction.atomic():
+            fields = sorted({f for _, ticket_fields, _ in entries for f in ticket_fields})
+            bulk_update_with_history(
+                [ticket for ticket, _, _ in entries], Ticket, fields, batch_size=SYNC_BATCH_SIZE, default_user=user
+            )
+        done = entries
+        failed = 0
+    except Exception:
+        logger.exception("[Kobo Sync] Échec de la mise à jour groupée, repli ticket par ticket")
+        done, failed = [], 0
+        for entry in entries:
+            ticket, ticket_fields, row = entry
+            try:
+                with transaction.atomic():
+                    bulk_update_with_history([ticket], Ticket, ticket_fields, default_user=user)
+                done.append(entry)
+            except Exception as inner:
+                failed += 1
+                row_errors.append("failed", "row_error", message=str(inner), details=row)
+    if hasattr(Ticket, "bulk_update_cache"):
+        Ticket.bulk_update_cache([ticket for ticket, _, _ in done])
+    # Pas de bootstrap_escalation_fields() ici : l'état d'escalade n'est initialisé qu'à la création
+    return [ticket for ticket, _, _ in done], failed
+
+
 # ---------------------------------------------------------------------------
 # Règles métier supplémentaires (priority / status / date_of_incident)
 # ---------------------------------------------------------------------------
-import unicodedata
 
 def _strip_accents_lower(s: str) -> str:
     if not isinstance(s, str):
         return ""
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))
-    return s.lower()
+    return _without_accents(s).lower()
 
 
 def _infer_priority(row: Dict[str, Any], category_value: Optional[str]) -> Optional[str]:
@@ -435,13 +933,123 @@ def _maybe_set_resolved(ticket) -> bool:
 # Recherche / Mapping / Upsert
 # ---------------------------------------------------------------------------
 
-def _find_existing_ticket(row: Dict[str, Any], direct_map: Dict[str, str]) -> Optional[Any]:
-    """Tente de retrouver un Ticket existant par 'code', puis métadonnées Kobo."""
+def _chunks(iterable: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    """Découpe un itérable (ex. le flux paginé des soumissions) en listes de `size` éléments."""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _read_ahead(iterable: Iterable[Any], depth: int = 1) -> Iterable[Any]:
+    """Consomme `iterable` dans un thread d'arrière-plan, avec `depth` éléments d'avance :
+    la page KPI suivante est téléchargée pendant que la page courante est écrite en base.
+    Les exceptions du producteur sont relancées côté consommateur ; fermer le générateur
+    arrête le producteur. Le thread ne fait que des appels HTTP (aucun accès à la base).
+    """
+    buf: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buf.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((True, item)):
+                    return
+            put((False, None))
+        except BaseException as e:  # relayée au consommateur
+            put((False, e))
+
+    threading.Thread(target=produce, name="kobo-read-ahead", daemon=True).start()
+    try:
+        while True:
+            ok, item = buf.get()
+            if ok:
+                yield item
+            elif item is None:
+                return
+            else:
+                raise item
+    finally:
+        stop.set()
+
+
+def _page_batches(pages: Iterable[List[Any]], size: int) -> Iterable[List[Any]]:
+    """Lots alignés sur les pages KPI : un lot ne chevauche jamais deux requêtes HTTP."""
+    for page in pages:
+        yield from _chunks(page, size)
+
+
+# Métadonnées Kobo -> champ Ticket (recherche de secours quand le code est absent)
+TICKET_KOBO_KEYS = (("kobo_uuid", "_uuid"), ("instance_id", "meta/instanceID"))
+
+
+def _prefetch_tickets(rows: List[Dict[str, Any]], direct_map: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Charge en UNE requête (OR sur code / kobo_uuid / instance_id) les Tickets référencés par le lot.
+    Retourne un index par champ : {"code": {valeur: ticket}, "kobo_uuid": {...}, "instance_id": {...}}.
+    """
+    code_keys = [k for k, target in direct_map.items() if target == "code"]
+    wanted: Dict[str, set] = {"code": {str(row[k]) for row in rows for k in code_keys if row.get(k)}}
+    for field_name, kobo_key in TICKET_KOBO_KEYS:
+        if hasattr(Ticket, field_name):
+            wanted[field_name] = {str(row[kobo_key]) for row in rows if row.get(kobo_key)}
+    lookups: Dict[str, Dict[str, Any]] = {name: {} for name in wanted}
+    cond = djm.Q()
+    for name, values in wanted.items():
+        if values:
+            cond |= djm.Q(**{f"{name}__in": values})
+    if not cond:
+        return lookups
+    for t in Ticket.objects.filter(cond):
+        for name, values in wanted.items():
+            value = getattr(t, name, None)
+            if value is not None and str(value) in values:
+                lookups[name][str(value)] = t
+    return lookups
+
+
+def _remember_ticket(lookups: Optional[Dict[str, Dict[str, Any]]], ticket) -> None:
+    """Ajoute un ticket (créé pendant le lot) à l'index, pour les lignes suivantes du même lot."""
+    if lookups is None:
+        return
+    for name, index in lookups.items():
+        value = getattr(ticket, name, None)
+        if value:
+            index[str(value)] = ticket
+
+
+def _find_existing_ticket(
+    row: Dict[str, Any],
+    direct_map: Dict[str, str],
+    lookups: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[Any]:
+    """Tente de retrouver un Ticket existant par 'code', puis métadonnées Kobo.
+    `lookups` : index pré-chargé par lot (cf. _prefetch_tickets) ; aucune requête par ligne.
+    """
     ref_value = None
     for kobo_key, target in direct_map.items():
         if target == "code" and kobo_key in row:
             ref_value = row[kobo_key]
             break
+    if lookups is not None:
+        candidates = [("code", ref_value)] if ref_value else []
+        candidates += [(f, row.get(k)) for f, k in TICKET_KOBO_KEYS if row.get(k) and f in lookups]
+        for field_name, value in candidates:
+            obj = lookups[field_name].get(str(value))
+            if obj:
+                return obj
+        return None
+
     if ref_value:
         try:
             obj = Ticket.objects.filter(code=ref_value).first()
@@ -456,9 +1064,9 @@ def _find_existing_ticket(row: Dict[str, Any], direct_map: Dict[str, str]) -> Op
     if "meta/instanceID" in row and hasattr(Ticket, "instance_id"):
         candidates.append(("instance_id", row["meta/instanceID"]))
 
-    for field, value in candidates:
+    for field_name, value in candidates:
         try:
-            obj = Ticket.objects.filter(**{field: value}).first()
+            obj = Ticket.objects.filter(**{field_name: value}).first()
             if obj:
                 return obj
         except Exception:
@@ -466,94 +1074,212 @@ def _find_existing_ticket(row: Dict[str, Any], direct_map: Dict[str, str]) -> Op
     return None
 
 
+@lru_cache(maxsize=None)
+def _model_field_index(model) -> Dict[str, Any]:
+    """{nom: champ} d'un modèle ; le _meta ne change pas pendant la vie du process."""
+    return {f.name: f for f in model._meta.get_fields()}
+
+
+def _compile_direct_map(
+    direct_map: Dict[str, str], model, resolve_label=None
+) -> List[Tuple[str, str, bool, bool, bool]]:
+    """Prépare une fois par sync le traitement des champs directs :
+    [(kobo_key, model_field, is_date, is_char, is_select)], sans les cibles absentes du modèle ni
+    les FK (laissées à une autre logique). Évite get_field()/isinstance par ligne et par champ ;
+    is_select (question select_* selon `resolve_label`) réserve la résolution de labels à ces champs.
+    """
+    field_objs = _model_field_index(model)
+    plan: List[Tuple[str, str, bool, bool, bool]] = []
+    for kobo_key, model_field in direct_map.items():
+        field_obj = field_objs.get(model_field)
+        if field_obj is None:
+            continue
+        # Éviter d'assigner des strings sur des FK
+        if getattr(getattr(field_obj, "remote_field", None), "model", None) is not None:
+            continue
+        is_date = model_field.endswith(("_at", "_date", "submitted_at"))
+        is_select = resolve_label is not None and resolve_label.is_select(kobo_key)
+        plan.append((kobo_key, model_field, is_date, isinstance(field_obj, djm.CharField), is_select))
+    return plan
+
+
+def _compile_extras_map(
+    extras_map: List[Tuple[str, str]], resolve_label=None
+) -> List[Tuple[str, Tuple[str, ...], bool, bool]]:
+    """Prépare une fois par sync les extras : [(kobo_key, chemin découpé, is_select, split_list)].
+    Le préfixe "json_ext." est retiré et le chemin découpé ici plutôt qu'à chaque ligne ;
+    split_list marque les cibles dont une chaîne "a, b" est stockée en liste.
+    """
+    plan: List[Tuple[str, Tuple[str, ...], bool, bool]] = []
+    for kobo_key, dotted in extras_map:
+        path = dotted[9:] if dotted.startswith("json_ext.") else dotted
+        is_select = resolve_label is not None and resolve_label.is_select(kobo_key)
+        plan.append((kobo_key, tuple(path.split(".")), is_select, dotted.endswith("responsable_plainte")))
+    return plan
+
+
 def _apply_mapping(
     row: Dict[str, Any],
     direct_map: Dict[str, str],
     extras_map: List[Tuple[str, str]],
     ticket: Any,
     resolve_label=None,
+    plan: Optional[List[Tuple[str, str, bool, bool, bool]]] = None,
+    extras_plan: Optional[List[Tuple[str, Tuple[str, ...], bool, bool]]] = None,
 ) -> Tuple[Dict[str, Any], bool]:
-    """Applique le mapping et retourne (json_ext, changed)."""
-    model_fields = {f.name for f in ticket._meta.get_fields()}
-    original_json = deepcopy(getattr(ticket, "json_ext", {}) or {})
-    json_ext: Dict[str, Any] = deepcopy(original_json)
+    """Applique le mapping et retourne (json_ext, changed).
+    `plan` / `extras_plan` : résultats de _compile_direct_map / _compile_extras_map avec le même
+    `resolve_label` (calculés ici s'ils ne sont pas fournis).
+    """
+    if plan is None:
+        plan = _compile_direct_map(direct_map, type(ticket), resolve_label)
+    if extras_plan is None:
+        extras_plan = _compile_extras_map(extras_map, resolve_label)
+    # Copie superficielle ; _dot_set_parts copie les sous-dicts qu'il modifie (pas de deepcopy par ligne)
+    json_ext: Dict[str, Any] = dict(getattr(ticket, "json_ext", {}) or {})
+    copied = {id(json_ext)}
     changed = False
 
     # Champs directs
-    for kobo_key, model_field in direct_map.items():
-        if kobo_key not in row or model_field not in model_fields:
+    for kobo_key, model_field, is_date, is_char, select in plan:
+        if kobo_key not in row:
             continue
         val = row[kobo_key]
-        if resolve_label is not None:
+        if select:
             val = resolve_label(kobo_key, val)
 
         # Parsing dates
-        if model_field.endswith(("_at", "_date", "submitted_at")):
+        if is_date:
             val = _parse_ts(val)
 
-        # Gestion du type du champ cible
-        try:
-            field_obj = ticket._meta.get_field(model_field)
-        except Exception:
-            field_obj = None
-
         # Si la valeur est une liste mais le champ est un CharField → join
-        if isinstance(val, list) and isinstance(field_obj, djm.CharField):
+        if is_char and isinstance(val, list):
             val = ", ".join(map(str, val))
 
-        # Éviter d'assigner des strings sur des FK
-        if getattr(getattr(field_obj, "remote_field", None), "model", None) is not None:
-            # Laisse une autre logique résoudre les FK si nécessaire
-            continue
-
         if isinstance(val, str):
             val = val.strip()
 
         changed |= _assign_if_changed(ticket, model_field, val)
 
     # Extras -> json_ext (toujours stockés, liste conservée)
-    for kobo_key, dotted in extras_map:
+    for kobo_key, parts, select, split_list in extras_plan:
         if kobo_key not in row:
             continue
         val = row[kobo_key]
-        if resolve_label is not None:
+        if select:
             val = resolve_label(kobo_key, val)
         # Normalisations spécifiques
-        if isinstance(val, str) and "," in val and dotted.endswith("responsable_plainte"):
+        if split_list and isinstance(val, str) and "," in val:
             val = [v.strip() for v in val.split(",") if v.strip()]
         val = _coerce_bool_fr(val)
-        path = dotted[9:] if dotted.startswith("json_ext.") else dotted
-        _dot_set(json_ext, path, val)
-
-    if json_ext != original_json:
-        changed = True
+        changed |= _dot_set_parts(json_ext, parts, val, copied)
 
     return json_ext, changed
 
 
+def _upsert_ticket(
+    row: Dict[str, Any],
+    direct_map: Dict[str, str],
+    extras_map: List[Tuple[str, str]],
+    resolve_label,
+    sub_ts: Optional[timezone.datetime],
+    *,
+    plan=None,
+    extras_plan=None,
+    lookups=None,
+    locations=None,
+    pending=None,
+    creates=None,
+) -> Tuple[Any, bool, bool]:
+    """Retrouve (ou instancie) le ticket d'une soumission et lui applique mapping, Location,
+    règles métier et champs génériques, sans sauvegarder. Retourne (ticket, changed, is_create).
+    `lookups` / `locations` : index pré-chargés du lot ; `pending` / `creates` : tickets déjà
+    modifiés / créés par une ligne précédente du lot (start_sync), repris pour cumuler les changements.
+    """
+    ticket = _find_existing_ticket(row, direct_map, lookups) or Ticket()
+    if creates and ticket.pk in creates:
+        ticket = creates[ticket.pk][0]
+        queued_create = True
+    else:
+        queued_create = False
+        if pending and ticket.pk in pending:
+            ticket = pending[ticket.pk][0]
+
+    # (Optionnel) Liaison d'une Location si le modèle possède un champ 'location'
+    loc = _resolve_location_from_row(row, locations)
+    if loc is not None:
+        _assign_fk_if_changed(ticket, "location", loc)
+
+    json_ext, changed = _apply_mapping(
+        row, direct_map, extras_map, ticket,
+        resolve_label=resolve_label, plan=plan, extras_plan=extras_plan,
+    )
+
+    # Règles métier: priority / status / date_of_incident
+    try:
+        prio = _infer_priority(row, getattr(ticket, "category", None))
+        if prio:
+            changed |= _assign_if_changed(ticket, "priority", prio)
+    except Exception:
+        pass
+
+    try:
+        changed |= _maybe_set_resolved(ticket)
+    except Exception:
+        pass
+
+    try:
+        incident_date = _infer_incident_date(row, sub_ts)
+        if incident_date is not None:
+            changed |= _assign_if_changed(ticket, "date_of_incident", incident_date)
+    except Exception:
+        pass
+
+    # Champs génériques facultatifs
+    if hasattr(ticket, "json_ext"):
+        if (getattr(ticket, "json_ext", {}) or {}) != json_ext:
+            ticket.json_ext = json_ext
+            changed = True
+    if hasattr(ticket, "submitted_at") and sub_ts:
+        changed |= _assign_if_changed(ticket, "submitted_at", sub_ts)
+    if hasattr(ticket, "source") and not getattr(ticket, "source", None):
+        changed |= _assign_if_changed(ticket, "source", "KOBO")
+
+    return ticket, changed, queued_create or ticket.pk is None
+
+
 # ---------------------------------------------------------------------------
 # API publique : synchronisations
 # ---------------------------------------------------------------------------
 
-def start_sync(kobo_form: KoboForm, user=None, since: Optional[timezone.datetime] = None, dry_run: bool = False) -> None:
-    """Lance la synchronisation pour un KoboForm."""
+def start_sync(
+    kobo_form: KoboForm,
+    user=None,
+    since: Optional[timezone.datetime] = None,
+    dry_run: bool = False,
+    legacy_save: bool = False,
+) -> None:
+    """Lance la synchronisation pour un KoboForm.
+    Les nouveaux tickets et les tickets existants modifiés sont écrits par lot (INSERT / UPDATE
+    groupés + historique) ;
+    `legacy_save=True` revient à un ticket.save() par ligne (signaux post_save, surcharges de save()).
+    """
+    user = _resolve_user(user)
     token = _get_token(kobo_form)
     base_url = (token.url_kobo or "").strip().rstrip("/")
     if not base_url:
         raise ValueError("Le KoboToken associé n'a pas d'URL (url_kobo).")
 
     uid = _get_uid(kobo_form)
-    client = KoboClient(base_url=base_url, token=token.api_key)
+    client = _client_for(base_url, token.api_key)
 
     # Résolution des labels (select_one / select_multiple)
-    LABEL_LANG = "fr"  # ou "French" selon tes assets
-    try:
-        resolve_label = _build_choice_resolver(client, uid, lang=LABEL_LANG)
-    except Exception as e:
-        logger.warning("[Kobo Label] Désactivé: %s", e)
-        resolve_label = None
+    resolve_label = _label_resolver(client, uid)
 
     direct_map, extras_map = _build_mapping(kobo_form)
+    direct_plan = _compile_direct_map(direct_map, Ticket, resolve_label)
+    extras_plan = _compile_extras_map(extras_map, resolve_label)
+    page_size = getattr(kobo_form, "page_size", None) or PAGE_SIZE
 
     # borne temporelle (BACKOFF)
     _since = since or getattr(kobo_form, "last_sync_date", None)
@@ -564,128 +1290,168 @@ def start_sync(kobo_form: KoboForm, user=None, since: Optional[timezone.datetime
 
     created = updated = skipped = failed = 0
     max_submission_ts: Optional[timezone.datetime] = getattr(kobo_form, "last_sync_date", None)
-
+    # Logs "row_error" du lot courant, écrits en une fois en fin de lot
+    row_errors = _LogBuffer(kobo_form, user)
+    # Index des Locations déjà résolues pendant cette sync
+    locations: Dict[Tuple[str, str], Any] = {}
+    seen_uuids: set = set()
+    # Tickets existants à mettre à jour en fin de lot {pk: (ticket, champs, ligne)}
+    pending_updates = None if legacy_save or bulk_update_with_history is None else {}
+    # Nouveaux tickets à insérer en fin de lot {pk: (ticket, ligne)}
+    pending_creates = None if legacy_save or bulk_create_with_history is None else {}
+
+    # Filtre temporel appliqué côté KPI : seules les nouvelles soumissions sont transférées.
+    # Le filtrage par ligne ci-dessous reste en garde-fou (serveurs ignorant `query`)
+    pages = client.iter_pages(uid, page_size=page_size, query=_submitted_since_query(_since))
     try:
-        for row in client.iter_submissions(uid):
-            # Filtrage côté client
-            sub_ts = _parse_ts(row.get("_submission_time") or row.get("end") or row.get("start"))
-            if _since and sub_ts and sub_ts <= _since:
-                skipped += 1
-                continue
-
-            if sub_ts and (max_submission_ts is None or sub_ts > max_submission_ts):
-                max_submission_ts = sub_ts
-
-            try:
-                with transaction.atomic():
-                    ticket = _find_existing_ticket(row, direct_map) or Ticket()
-
-                    # (Optionnel) Liaison d'une Location si le modèle possède un champ 'location'
-                    loc = _resolve_location_from_row(row)
-                    if loc is not None and hasattr(ticket, "location"):
-                        _assign_if_changed(ticket, "location", loc)
-
-                    json_ext, changed = _apply_mapping(row, direct_map, extras_map, ticket, resolve_label=resolve_label)
-
-                    # Règles métier: priority / status / date_of_incident
-                    try:
-                        prio = _infer_priority(row, getattr(ticket, "category", None))
-                        if prio:
-                            changed |= _assign_if_changed(ticket, "priority", prio)
-                    except Exception:
-                        pass
-
-                    try:
-                        changed |= _maybe_set_resolved(ticket)
-                    except Exception:
-                        pass
+        for batch in _page_batches(_read_ahead(pages), SYNC_BATCH_SIZE):
+            # Une seule requête par lot pour retrouver les tickets existants (code / métadonnées Kobo)
+            lookups = _prefetch_tickets(batch, direct_map)
+            _prefetch_locations(batch, locations)
+            batch_created: List[Any] = []
+            batch_updated: List[Any] = []
+            # Un seul COMMIT par lot ; chaque ligne garde son savepoint (atomic imbriqué)
+            # et peut échouer seule sans annuler le reste du lot
+            with transaction.atomic():
+                for row in batch:
+                    # Soumissions vides ou déjà vues dans cette sync (pages qui se recouvrent
+                    # quand de nouvelles soumissions arrivent pendant la pagination)
+                    row_uuid = row.get("_uuid") if row else None
+                    if not row or (row_uuid and row_uuid in seen_uuids):
+                        skipped += 1
+                        continue
+                    if row_uuid:
+                        seen_uuids.add(row_uuid)
+
+                    # Filtrage côté client
+                    sub_ts = _parse_ts(row.get("_submission_time") or row.get("end") or row.get("start"))
+                    if _since and sub_ts and sub_ts <= _since:
+                        skipped += 1
+                        continue
+
+                    if sub_ts and (max_submission_ts is None or sub_ts > max_submission_ts):
+                        max_submission_ts = sub_ts
 
                     try:
-                        incident_date = _infer_incident_date(row, sub_ts)
-                        if incident_date is not None:
-                            changed |= _assign_if_changed(ticket, "date_of_incident", incident_date)
-                    except Exception:
-                        pass
-
-                    # Champs génériques facultatifs
-                    if hasattr(ticket, "json_ext"):
-                        if (getattr(ticket, "json_ext", {}) or {}) != json_ext:
-                            ticket.json_ext = json_ext
-                            changed = True
-                    if hasattr(ticket, "submitted_at") and sub_ts:
-                        changed |= _assign_if_changed(ticket, "submitted_at", sub_ts)
-                    if hasattr(ticket, "source") and not getattr(ticket, "source", None):
-                        changed |= _assign_if_changed(ticket, "source", "KOBO")
-
-                    if dry_run:
-                        logger.info("[Dry-Run] Ticket simulé (create/update): %s", getattr(ticket, "code", None))
-                    else:
-                        is_create = ticket.pk is None
-                        if is_create or changed:
-                            try:
+                        with transaction.atomic():
+                            ticket, changed, is_create = _upsert_ticket(
+                                row, direct_map, extras_map, resolve_label, sub_ts,
+                                plan=direct_plan, extras_plan=extras_plan,
+                                lookups=lookups, locations=locations,
+                                pending=pending_updates, creates=pending_creates,
+                            )
+
+                            if dry_run:
+                                logger.info("[Dry-Run] Ticket simulé (create/update): %s", getattr(ticket, "code", None))
+                            elif is_create or changed:
                                 # Fixer max_escalation_level selon la catégorie
                                 # sensible peut monter jusqu’au national
                                 ticket.max_escalation_level = 4 if ticket.priority == "Critical" else 3
-                                ticket.save(user=user)
-                                bootstrap_escalation_fields(ticket)
-                            except TypeError:
-                                ticket.save()
-                            if is_create:
-                                created += 1
+                                if is_create and pending_creates is not None:
+                                    if _queue_ticket_create(ticket, user, pending_creates, row):
+                                        _remember_ticket(lookups, ticket)
+                                        continue  # compté à l'écriture groupée de fin de lot
+                                elif (
+                                    not is_create
+                                    and pending_updates is not None
+                                    and _queue_ticket_update(ticket, user, pending_updates, row)
+                                ):
+                                    continue  # compté à l'écriture groupée de fin de lot
+                                save_kwargs = {} if is_create else {"update_fields": _ticket_update_fields(ticket)}
+                                _save(ticket, user, **save_kwargs)
+                                if is_create:  # l'escalade d'un ticket existant est déjà en cours
+                                    bootstrap_escalation_fields(ticket)
+                                _remember_ticket(lookups, ticket)
+                                (batch_created if is_create else batch_updated).append(ticket)
                             else:
-                                updated += 1
+                                skipped += 1  # aucun changement → ne pas sauver pour éviter ValidationError
+
+                    except ValidationError as ve:
+                        # HistoryBusinessModel peut lever si aucun changement; on le compte en 'skipped'
+                        msg = " ".join(map(str, ve.messages))
+                        if "no changes" in msg.lower():
+                            skipped += 1
                         else:
-                            skipped += 1  # aucun changement → ne pas sauver pour éviter ValidationError
-
-            except ValidationError as ve:
-                # HistoryBusinessModel peut lever si aucun changement; on le compte en 'skipped'
-                msg = " ".join(map(str, ve.messages))
-                if "no changes" in msg.lower():
-                    skipped += 1
-                else:
-                    failed += 1
-                    logger.exception("[Kobo Sync] Validation error")
-                    _save_log(kobo_form, user, status="failed", action="row_error", message=str(ve), details=row)
-            except Exception as inner:
-                failed += 1
-                logger.exception("[Kobo Sync] Erreur upsert pour une soumission")
-                _save_log(kobo_form, user, status="failed", action="row_error", message=str(inner), details=row)
+                            failed += 1
+                            logger.exception("[Kobo Sync] Validation error")
+                            row_errors.append("failed", "row_error", message=str(ve), details=row)
+                    except Exception as inner:
+                        failed += 1
+                        logger.exception("[Kobo Sync] Erreur upsert pour une soumission")
+                        row_errors.append("failed", "row_error", message=str(inner), details=row)
+
+                done, ko = _flush_ticket_creates(pending_creates, user, row_errors)
+                batch_created += done
+                failed += ko
+                done, ko = _flush_ticket_updates(pending_updates, user, row_errors)
+                batch_updated += done
+                failed += ko
+
+            row_errors.flush()
+            created += len(batch_created)
+            updated += len(batch_updated)
+            if batch_created or batch_updated:
+                # Envoyé à la validation réelle : dans la transaction d'un appelant, le lot n'est
+                # qu'un savepoint et les tickets peuvent encore être annulés
+                transaction.on_commit(
+                    lambda created_=batch_created, updated_=batch_updated: kobo_batch_synced.send(
+                        sender=Ticket, kobo_form=kobo_form, created=created_, updated=updated_
+                    )
+                )
 
     except Exception as e:
+        row_errors.flush()
         _save_log(kobo_form, user, status="failed", action="error", message=str(e))
         logger.exception("[Kobo Sync] Erreur pendant la collecte des soumissions")
         return
 
-    # Mise à jour du pointeur temporel
-    setattr(kobo_form, "last_sync_date", max_submission_ts or timezone.now())
-    try:
-        kobo_form.save(user=user)
-    except TypeError:
-        kobo_form.save()
-
-    _save_log(
-        kobo_form,
-        user,
-        status="success",
-        action="end",
-        message=f"Terminé: created={created}, updated={updated}, skipped={skipped}, failed={failed}",
-        details={"created": created, "updated": updated, "skipped": skipped, "failed": failed},
-    )
+    # Pointeur temporel et log de fin validés ensemble : un seul COMMIT, et jamais de pointeur
+    # avancé sans le log qui en rend compte
+    with transaction.atomic():
+        setattr(kobo_form, "last_sync_date", max_submission_ts or timezone.now())
+        # Un seul UPDATE limité au pointeur (+ colonnes d'audit), pas de réécriture de tout le formulaire
+        update_fields = history_update_fields(["last_sync_date"])
+        _save(kobo_form, user, update_fields=update_fields)
+
+        _save_log(
+            kobo_form,
+            user,
+            status="success",
+            action="end",
+            message=f"Terminé: created={created}, updated={updated}, skipped={skipped}, failed={failed}",
+            details={"created": created, "updated": updated, "skipped": skipped, "failed": failed},
+        )
+
+
+def sync_all_kobo_forms() -> int:
+    """Appelée par un scheduler : envoie une tâche Celery par formulaire éligible.
+    Les formulaires sont synchronisés en parallèle par les workers (un verrou par formulaire
+    évite deux syncs simultanées du même asset), le scheduler ne fait que la répartition.
+    Les tâches sont publiées ensemble (group Celery, un seul producteur) ; retourne leur nombre.
+    """
+    from celery import group
 
+    from .tasks import sync_form_task  # import local : tasks importe ce module
 
-def sync_all_kobo_forms() -> None:
-    """Appelée par un scheduler : exécute start_sync() pour les formulaires éligibles."""
-    for form in KoboForm.objects.all().iterator():
+    # Le dispatcher ne sauvegarde pas les formulaires : seules les colonnes lues sont chargées ;
+    # str(form) lit form.user.username, d'où la jointure
+    due = (
+        forms_due_for_sync()
+        .select_related("user")
+        .only("id", "name", "kobo_uid", "user", "user__username")
+    )
+    signatures = []
+    for form in due.iterator(chunk_size=100):
+        user_id = getattr(form, "user_id", None)
+        logger.info("[Scheduler] Sync %s (UID=%s)", form, getattr(form, "kobo_uid", "?"))
+        signatures.append(sync_form_task.si(str(form.pk), str(user_id) if user_id else None, only_if_due=True))
+    if signatures:
         try:
-            if not getattr(form, "auto_sync", False):
-                continue
-            if not should_sync(form):
-                continue
-            user = getattr(form, "user", None)
-            logger.info(f"[Scheduler] Sync {form} (UID={getattr(form, 'kobo_uid', '?')})")
-            start_sync(form, user=user)
+            group(signatures).apply_async()
         except Exception as e:
-            logger.error(f"[Scheduler] Erreur de sync pour {form}: {e}")
+            logger.error("[Scheduler] Erreur d'envoi des %d syncs: %s", len(signatures), e)
+            return 0
+    return len(signatures)
 
 
 # ---------------------------------------------------------------------------
@@ -698,20 +1464,39 @@ def sync_since(kobo_form: KoboForm, minutes: int, user=None) -> None:
     start_sync(kobo_form, user=user, since=since)
 
 
-def sync_one(kobo_form: KoboForm, submission_id: Any, user=None, dry_run: bool = False) -> Optional[Any]:
-    """Synchronise UNE soumission par identifiant externe (si l'endpoint unitaire est dispo)."""
+def _row_digest(row: Dict[str, Any], direct_map: Dict[str, str], extras_map: List[Tuple[str, str]]) -> str:
+    """Empreinte (blake2b) d'une soumission et du mapping qui lui est appliqué :
+    un changement de mapping invalide aussi les empreintes mémorisées.
+    """
+    payload = {"row": row, "direct": direct_map, "extras": extras_map}
+    if orjson is not None:
+        raw = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+    else:
+        raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def sync_one(
+    kobo_form: KoboForm,
+    submission_id: Any,
+    user=None,
+    dry_run: bool = False,
+    log_buffer: Optional[_LogBuffer] = None,
+) -> Optional[Any]:
+    """Synchronise UNE soumission par identifiant externe (si l'endpoint unitaire est dispo).
+    Retourne le ticket, ou None si la soumission est introuvable ou inchangée depuis sa dernière
+    sync (empreinte en cache : ni recherche du ticket ni écriture).
+    `log_buffer` : appelant traitant plusieurs soumissions ; le log "single" y est ajouté (écrit
+    par son flush()) au lieu d'un INSERT immédiat.
+    """
+    user = _resolve_user(user)
     token = _get_token(kobo_form)
     base_url = (token.url_kobo or "").strip().rstrip("/")
     uid = _get_uid(kobo_form)
-    client = KoboClient(base_url=base_url, token=token.api_key)
+    client = _client_for(base_url, token.api_key)
 
     # Résolution des labels (select_one / select_multiple)
-    LABEL_LANG = "fr"
-    try:
-        resolve_label = _build_choice_resolver(client, uid, lang=LABEL_LANG)
-    except Exception as e:
-        logger.warning("[Kobo Label] Désactivé: %s", e)
-        resolve_label = None
+    resolve_label = _label_resolver(client, uid)
 
     row = client.get_submission(uid, submission_id)
     if not row:
@@ -719,71 +1504,44 @@ def sync_one(kobo_form: KoboForm, submission_id: Any, user=None, dry_run: bool =
         return None
 
     direct_map, extras_map = _build_mapping(kobo_form)
+    direct_plan = _compile_direct_map(direct_map, Ticket, resolve_label)
+    extras_plan = _compile_extras_map(extras_map, resolve_label)
     sub_ts = _parse_ts(row.get("_submission_time") or row.get("end") or row.get("start"))
 
-    with transaction.atomic():
-        ticket = _find_existing_ticket(row, direct_map) or Ticket()
-        loc = _resolve_location_from_row(row)
-        if loc is not None and hasattr(ticket, "location"):
-            _assign_if_changed(ticket, "location", loc)
-
-        json_ext, changed = _apply_mapping(row, direct_map, extras_map, ticket, resolve_label=resolve_label)
-
-        # Règles métier: priority / status / date_of_incident
-        try:
-            prio = _infer_priority(row, getattr(ticket, "category", None))
-            if prio:
-                changed |= _assign_if_changed(ticket, "priority", prio)
-        except Exception:
-            pass
-
-        try:
-            changed |= _maybe_set_resolved(ticket)
-        except Exception:
-            pass
-
-        try:
-            incident_date = _infer_incident_date(row, sub_ts)
-            if incident_date is not None:
-                changed |= _assign_if_changed(ticket, "date_of_incident", incident_date)
-        except Exception:
-            pass
+    digest_key = f"kobosync:{kobo_form.pk}:{submission_id}"
+    digest = _row_digest(row, direct_map, extras_map)
+    if not dry_run and cache.get(digest_key) == digest:
+        logger.info("[sync_one] Soumission inchangée (empreinte): %s", submission_id)
+        return None
 
-        if hasattr(ticket, "json_ext"):
-            if (getattr(ticket, "json_ext", {}) or {}) != json_ext:
-                ticket.json_ext = json_ext
-                changed = True
-        if hasattr(ticket, "submitted_at") and sub_ts:
-            changed |= _assign_if_changed(ticket, "submitted_at", sub_ts)
-        if hasattr(ticket, "source") and not getattr(ticket, "source", None):
-            changed |= _assign_if_changed(ticket, "source", "KOBO")
+    with transaction.atomic():
+        ticket, changed, is_create = _upsert_ticket(
+            row, direct_map, extras_map, resolve_label, sub_ts, plan=direct_plan, extras_plan=extras_plan,
+        )
 
         if dry_run:
             logger.info("[Dry-Run] sync_one simulé pour submission_id=%s", submission_id)
             return ticket
 
-        is_create = ticket.pk is None
         if is_create or changed:
-            try:
-                if not ticket.due_date:
-                    ticket.due_date = next_due_date(0)  # SLA du niveau local
-
-                # Fixer max_escalation_level selon la catégorie
-                # sensible peut monter jusqu’au national
-                # ticket.max_escalation_level = 4 if ticket.priority == "Critical" else 3
-                ticket.save(user=user)
+            if not ticket.due_date:
+                ticket.due_date = next_due_date(0)  # SLA du niveau local
+
+            # Fixer max_escalation_level selon la catégorie
+            # sensible peut monter jusqu’au national
+            # ticket.max_escalation_level = 4 if ticket.priority == "Critical" else 3
+            save_kwargs = {} if is_create else {"update_fields": _ticket_update_fields(ticket)}
+            _save(ticket, user, **save_kwargs)
+            if is_create:  # l'escalade d'un ticket existant est déjà en cours
                 bootstrap_escalation_fields(ticket)
-            except TypeError:
-                ticket.save()
             # Journaliser la sync unitaire
-            _save_log(
-                kobo_form,
-                user,
-                status="success",
-                action="single",
-                message=f"sync_one: submission={submission_id}, created={is_create}",
-                details=row,
-            )
+            message = f"sync_one: submission={submission_id}, created={is_create}"
+            if log_buffer is not None:
+                log_buffer.append("success", "single", message=message, details=row)
+            else:
+                _save_log(kobo_form, user, status="success", action="single", message=message, details=row)
         else:
             logger.info("[sync_one] Aucun changement pour submission_id=%s", submission_id)
+        # Empreinte mémorisée une fois la transaction validée (après un rollback, la ligne est retraitée)
+        transaction.on_commit(lambda: cache.set(digest_key, digest, ROW_DIGEST_TTL))
         return ticket
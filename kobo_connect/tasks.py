@@ -1,13 +1,95 @@
+from contextlib import contextmanager
+from functools import partial
+
+from celery import shared_task
 from .synchronizer import sync_all_kobo_forms
 import logging
 
 logger = logging.getLogger(__name__)
 
+SYNC_LOCK_TIMEOUT = 3600  # secondes ; libère le verrou d'un worker tué en cours de sync
+DISPATCH_LOCK_TIMEOUT = 300  # secondes ; la répartition n'envoie que des tâches, elle est courte
+
+
+@contextmanager
+def _single_flight(key, timeout=SYNC_LOCK_TIMEOUT):
+    """
+    Verrou partagé entre workers via le cache Django ; produit True si le verrou est acquis.
+    Utilise cache.lock() (django-redis) si disponible, sinon cache.add() qui est atomique.
+    """
+    from django.core.cache import cache
+
+    if hasattr(cache, "lock"):
+        lock = cache.lock(key, timeout=timeout)
+        acquired = lock.acquire(blocking=False)
+        release = lock.release
+    else:
+        acquired = cache.add(key, "1", timeout)
+        release = partial(cache.delete, key)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                release()
+            except Exception:
+                logger.warning("[Kobo Sync] Verrou %s déjà expiré", key)
+
 
+@shared_task
 def run_kobo_sync_job(*args, **kwargs):
     """
     Fonction appelée par le scheduler pour lancer la synchronisation Kobo.
+    Tâche Celery (planifiable par Celery beat) ; reste appelable directement par un scheduler classique.
     """
+    from django.db import close_old_connections
+
     logger.info("[Scheduler] Démarrage de la tâche de synchronisation Kobo")
-    sync_all_kobo_forms()
-    logger.info("[Scheduler] Fin de la synchronisation Kobo")
+    # Un seul passage à la fois (plusieurs beat / schedulers) ; les syncs restent protégées
+    # individuellement par le verrou de sync_form_task
+    with _single_flight("kobo-sync-dispatch", timeout=DISPATCH_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            logger.info("[Scheduler] Répartition déjà en cours, passage ignoré")
+            return
+        try:
+            sent = sync_all_kobo_forms()
+        finally:
+            # Hors Celery (thread d'un scheduler classique), rien ne recycle la connexion entre deux
+            # passages : fermeture si elle est expirée (CONN_MAX_AGE) ou inutilisable, réutilisée sinon
+            close_old_connections()
+    # Les syncs elles-mêmes tournent dans les workers (sync_form_task) : seule la répartition est finie ici
+    logger.info("[Scheduler] Fin de la répartition : %d formulaire(s) envoyé(s)", sent)
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def sync_form_task(self, form_id, user_id=None, only_if_due=False):
+    """
+    Synchronise un KoboForm dans un worker Celery (action admin), pour ne pas bloquer la requête HTTP.
+    Les identifiants sont passés en str afin de rester sérialisables en JSON (UUID).
+    only_if_due : tâche envoyée par le scheduler ; l'échéance est revérifiée en base une fois le
+    verrou pris, la tâche ayant pu attendre dans la file pendant qu'une autre sync passait.
+    """
+    from django.contrib.auth import get_user_model
+    from .models import KoboForm
+    from .synchronizer import forms_due_for_sync, start_sync
+
+    # Token (URL + clé) et propriétaire lus par start_sync() : une seule requête jointe ;
+    # le mapping est chargé avec le formulaire et réutilisé par _build_mapping()
+    kobo_form = (
+        KoboForm.objects.filter(pk=form_id)
+        .select_related("api_key", "user")
+        .prefetch_related("field_mappings")
+        .first()
+    )
+    if kobo_form is None:
+        logger.warning("[Kobo Sync] KoboForm introuvable: %s", form_id)
+        return
+    user = get_user_model().objects.filter(pk=user_id).first() if user_id else None
+    with _single_flight(f"kobo-sync-{kobo_form.kobo_uid}") as acquired:
+        if not acquired:
+            logger.info("[Kobo Sync] Sync déjà en cours pour UID=%s, ignorée", kobo_form.kobo_uid)
+            return
+        if only_if_due and not forms_due_for_sync().filter(pk=kobo_form.pk).exists():
+            logger.info("[Kobo Sync] UID=%s synchronisé entre-temps, ignoré", kobo_form.kobo_uid)
+            return
+        start_sync(kobo_form, user)
@@ -1,3 +1,155 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from core.test_helpers import create_test_interactive_user
+from grievance_social_protection.apps import TicketConfig
+from grievance_social_protection.models import Ticket
+from kobo_connect import synchronizer
+from kobo_connect.models import KoboFieldMapping, KoboForm, KoboSyncLog, KoboToken
+from kobo_connect.synchronizer import forms_due_for_sync
+
+
+class FormsDueForSyncTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="kobo_due_sync")
+        token = KoboToken(url_kobo="https://kf.example.org", api_key="key", user=cls.user)
+        token.save(user=cls.user)
+        cls.token = token
+
+    def _form(self, uid, minutes_ago, interval):
+        form = KoboForm(
+            name=uid, kobo_uid=uid, api_key=self.token, user=self.user, auto_sync=True,
+            sync_interval=interval, last_sync_date=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+        form.save(user=self.user)
+        return form
+
+    def test_only_forms_past_their_interval_are_due(self):
+        due = self._form("due", minutes_ago=15, interval=10)
+        not_due = self._form("not_due", minutes_ago=5, interval=10)
+
+        pks = set(forms_due_for_sync().values_list("pk", flat=True))
+
+        self.assertIn(due.pk, pks)
+        self.assertNotIn(not_due.pk, pks)
+
+
+class _FakeKoboClient:
+    base_url = "https://kf.example.org"
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_pages(self, asset_uid, page_size=None, start=0, query=None):
+        yield list(self.rows)
+
+
+def _row(code, uuid, hour, comment):
+    return {
+        "_uuid": uuid, "_submission_time": f"2026-01-05T{hour:02d}:00:00",
+        "code": code, "title": f"Plainte {code}", "comment": comment,
+    }
+
+
+class StartSyncWritePathTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_interactive_user(username="kobo_write_path")
+        token = KoboToken(url_kobo="https://kf.example.org", api_key="key", user=cls.user)
+        token.save(user=cls.user)
+        form = KoboForm(name="write_path", kobo_uid="write_path", api_key=token, user=cls.user)
+        form.save(user=cls.user)
+        for kobo_field, grievance_field in (("code", "code"), ("title", "title"), ("comment", "json_ext.comment")):
+            KoboFieldMapping(kobo_form=form, kobo_field=kobo_field, grievance_field=grievance_field).save(user=cls.user)
+        cls.form = form
+
+    def _sync(self, rows, legacy_save):
+        form = KoboForm.objects.get(pk=self.form.pk)
+        with patch.object(synchronizer, "_client_for", return_value=_FakeKoboClient(rows)), \
+                patch.object(synchronizer, "_label_resolver", return_value=None):
+            synchronizer.start_sync(form, user=self.user, legacy_save=legacy_save)
+
+    def _state(self, code):
+        ticket = Ticket.objects.get(code=code)
+        history = list(ticket.history.order_by("history_date"))
+        return {
+            "id_set": ticket.id is not None and all(h.id == ticket.id for h in history),
+            "version": ticket.version,
+            "user_created": ticket.user_created_id,
+            "user_updated": ticket.user_updated_id,
+            "audit_dates_set": ticket.date_created is not None and ticket.date_updated is not None,
+            "updated_after_create": ticket.date_updated > ticket.date_created,
+            "category": ticket.category,
+            "title": ticket.title,
+            "json_ext": ticket.json_ext,
+            "history": [
+                (h.history_type, h.version, h.user_updated_id, h.category, h.json_ext) for h in history
+            ],
+        }
+
+    def _run(self, legacy_save, *batches):
+        # Each run is rolled back: both write paths sync the same submissions from the same state
+        states = []
+        with transaction.atomic():
+            for rows in batches:
+                self._sync(rows, legacy_save)
+                states.append(self._state("KOBO-1"))
+            transaction.set_rollback(True)
+        return states
+
+    def test_bulk_and_legacy_save_write_the_same_ticket(self):
+        batches = ([_row("KOBO-1", "u-1", 10, "first")], [_row("KOBO-1", "u-2", 11, "second")])
+
+        bulk = self._run(False, *batches)
+        legacy = self._run(True, *batches)
+
+        self.assertEqual(bulk, legacy)
+        created, updated = bulk
+        self.assertTrue(created["id_set"])
+        self.assertEqual(created["user_created"], self.user.id)
+        self.assertEqual(created["category"], TicketConfig.default_grievance_type)
+        self.assertEqual(created["json_ext"], {"comment": "first"})
+        self.assertEqual(updated["version"], created["version"] + 1)
+        self.assertTrue(updated["updated_after_create"])
+        self.assertEqual(updated["json_ext"], {"comment": "second"})
+        self.assertEqual(len(updated["history"]), 2)
+
+    def _failing_for(self, name, code):
+        real = getattr(synchronizer, name)
+
+        def bulk_write(objs, *args, **kwargs):
+            if any(ticket.code == code for ticket in objs):
+                raise IntegrityError(f"{code} rejected")
+            return real(objs, *args, **kwargs)
+        return patch.object(synchronizer, name, side_effect=bulk_write)
+
+    def _assert_one_row_failed(self):
+        self.assertEqual(KoboSyncLog.objects.filter(kobo_form=self.form, action="row_error").count(), 1)
+        end = KoboSyncLog.objects.filter(kobo_form=self.form, action="end").order_by("-sync_date").first()
+        self.assertIn("failed=1", end.error_message)
+
+    def test_bulk_create_falls_back_per_ticket_when_one_row_fails(self):
+        rows = [_row("KOBO-1", "u-1", 10, "a"), _row("KOBO-BAD", "u-2", 10, "b"), _row("KOBO-2", "u-3", 10, "c")]
+
+        with self._failing_for("bulk_create_with_history", "KOBO-BAD"):
+            self._sync(rows, legacy_save=False)
+
+        codes = set(Ticket.objects.filter(code__startswith="KOBO-").values_list("code", flat=True))
+        self.assertEqual(codes, {"KOBO-1", "KOBO-2"})
+        self._assert_one_row_failed()
+
+    def test_bulk_update_falls_back_per_ticket_when_one_row_fails(self):
+        self._sync([_row("KOBO-1", "u-1", 10, "a"), _row("KOBO-BAD", "u-2", 10, "b")], legacy_save=False)
+        rows = [_row("KOBO-1", "u-3", 11, "a2"), _row("KOBO-BAD", "u-4", 11, "b2")]
+
+        with self._failing_for("bulk_update_with_history", "KOBO-BAD"):
+            self._sync(rows, legacy_save=False)
 
-# Create your tests here.
+        self.assertEqual(Ticket.objects.get(code="KOBO-1").json_ext, {"comment": "a2"})
+        self.assertEqual(Ticket.objects.get(code="KOBO-BAD").json_ext, {"comment": "b"})
+        self._assert_one_row_failed()
@@ -1,25 +1,69 @@
-import json
 import re
+import string
+from functools import lru_cache
 
+from django.core.exceptions import PermissionDenied
 from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.translation import gettext as _
 
-camel_pat = re.compile(r'([A-Z])')
 under_pat = re.compile(r'_([a-z])')
+_UPPER = frozenset(string.ascii_uppercase)
 
+# Columns HistoryModel.save() rewrites on every update, whatever the caller changed
+HISTORY_AUDIT_FIELDS = ('date_updated', 'user_updated', 'version')
 
+
+# Field names form a small, fixed set converted again for every serialized object or query:
+# the conversions are memoized
+@lru_cache(maxsize=4096)
 def camel_to_underscore(name):
-    return camel_pat.sub(lambda x: '_' + x.group(1).lower(), name)
+    return ''.join('_' + c.lower() if c in _UPPER else c for c in name)
 
 
+@lru_cache(maxsize=4096)
 def underscore_to_camel(name):
     return under_pat.sub(lambda x: x.group(1).upper(), name)
 
 
+# Built once: json.dumps(cls=...) would instantiate an encoder per call. Default options, so the
+# output is the original json.dumps(..., cls=DjangoJSONEncoder) string
+_DJANGO_ENCODER = DjangoJSONEncoder()
+
+
+@lru_cache(maxsize=None)
+def _camel_keys(model):
+    return {f.attname: underscore_to_camel(f.attname) for f in model._meta.get_fields() if hasattr(f, 'attname')}
+
+
 def model_obj_to_json(model_obj):
-    model_obj_dict = model_obj.__dict__
-    model_obj_dict.pop('_state')
-    model_obj_dict = {underscore_to_camel(k): v for k, v in list(model_obj_dict.items())}
-    return json.dumps(model_obj_dict, cls=DjangoJSONEncoder)
+    # Reads __dict__ without popping '_state': the instance stays usable (and savable) afterwards
+    mapping = _camel_keys(type(model_obj))
+    model_obj_dict = {
+        mapping.get(k) or underscore_to_camel(k): v for k, v in model_obj.__dict__.items() if k != '_state'
+    }
+    return _DJANGO_ENCODER.encode(model_obj_dict)
+
+
+def history_update_fields(fields):
+    fields = list(fields)
+    return fields + [f for f in HISTORY_AUDIT_FIELDS if f not in fields]
+
+
+def has_perms_cached(info, *perms):
+    # Permission checks are memoized on the request so that nested resolvers
+    # and mutations do not query the auth backend again for the same perms
+    cache = getattr(info.context, '_kobo_perm_cache', None)
+    if cache is None:
+        cache = info.context._kobo_perm_cache = {}
+    key = perms[0] if len(perms) == 1 else frozenset(perms)
+    if key not in cache:
+        cache[key] = info.context.user.has_perms(perms)
+    return cache[key]
+
+
+def check_perms(info, *perms):
+    if not has_perms_cached(info, *perms):
+        raise PermissionDenied(_("Unauthorized"))
 
 
 
@@ -19,12 +19,15 @@ setup(
     description='The openIMIS Backend Kobo Connect module.',
     long_description=open('README.md').read(),
     long_description_content_type='text/markdown',
+    python_requires='>=3.11',
     install_requires=[
+        'celery',
         'django',
         'django-db-signals',
         'djangorestframework',
         'openimis-be-core',
         'openimis-be-grievance_social_protection',
+        'orjson',
         'pykobo',
     ],
     classifiers=[
@@ -35,7 +38,8 @@ setup(
         'License :: OSI Approved :: GNU Affero General Public License v3',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
 )